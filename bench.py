@@ -1,7 +1,101 @@
 #!/usr/bin/env python3.10
 # coding: utf-8
 
-from pytree.pytree import BinNode, Node
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+import tracemalloc
+
+from pytree.pytree import BinLeaf, BinNode, Node, ArrayTree
+
+
+LEVELS = 20  # A balanced binary tree of 2 ** 20 - 1 nodes for the benchmarks
+MAP_LEVELS = 12  # Smaller tree for map_reduce, the work is in the leafs
+LEAF_WORK = 20000  # Iterations of the leaf function of map_reduce
+
+
+def balanced_tree(levels: int) -> BinNode:
+    """Build a balanced binary tree
+
+    Args:
+        levels (int): Number of layers
+
+    Returns:
+        BinNode: The root
+    """
+    layer = [BinLeaf(1, i) for i in range(1 << (levels - 1))]
+    while len(layer) > 1:
+        layer = [layer[i] + layer[i + 1] for i in range(0, len(layer), 2)]
+    return layer[0]
+
+
+def allocated(build) -> tuple[object, int]:
+    """Build something and measure the memory it holds
+
+    Args:
+        build (Callable): Something to call without arguments
+
+    Returns:
+        tuple[object, int]: What is built and the bytes still allocated after the call
+    """
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def timed(call) -> float:
+    start = perf_counter()
+    call()
+    return perf_counter() - start
+
+
+def bench_array_tree(levels: int = LEVELS):
+    """Compare the memory and the traversal time of BinNode and ArrayTree
+
+    Args:
+        levels (int, optional): Number of layers of the tree. Defaults to LEVELS.
+    """
+    tree, tree_size = allocated(lambda: balanced_tree(levels))
+    array_tree, array_size = allocated(lambda: ArrayTree.from_tree(tree))
+    print(f"{len(array_tree)} nodes: BinNode {tree_size / len(array_tree):.0f} B/node, ArrayTree {array_size / len(array_tree):.0f} B/node")
+    for name, call, array_call in (
+        ("len", lambda: len(tree), lambda: len(array_tree)),
+        ("depth", lambda: tree.depth, lambda: array_tree.depth),
+        ("layers", lambda: tree.layers, lambda: array_tree.layers),
+        ("code", lambda: tree.code(lambda value, code: None), lambda: array_tree.code(lambda value, code: None)),
+        ("to_tuple", tree.to_tuple, array_tree.to_tuple),
+    ):
+        print(f"{name}: BinNode {timed(call):.3f} s, ArrayTree {timed(array_call):.3f} s")
+    print(f"from_tree {timed(lambda: ArrayTree.from_tree(tree)):.3f} s, to_tree {timed(array_tree.to_tree):.3f} s")
+
+
+def slow_leaf(leaf: BinLeaf) -> int:
+    total = 0
+    for i in range(LEAF_WORK):
+        total += i * leaf.weight
+    return total
+
+
+def combine_sum(node: BinNode, results: list[int]) -> int:
+    return sum(results)
+
+
+def bench_map_reduce(levels: int = MAP_LEVELS):
+    """Compare map_reduce without executor and on thread or process pools
+
+    Args:
+        levels (int, optional): Number of layers of the tree. Defaults to MAP_LEVELS.
+    """
+    tree = balanced_tree(levels)
+    print(f"map_reduce: sequential {timed(lambda: tree.map_reduce(slow_leaf, combine_sum)):.3f} s", end='')
+    for executor in (ThreadPoolExecutor, ProcessPoolExecutor):
+        with executor() as pool:
+            print(f", {executor.__name__} {timed(lambda: tree.map_reduce(slow_leaf, combine_sum, pool)):.3f} s", end='')
+    print()
+
 
 if __name__ == "__main__":
 
@@ -35,4 +129,7 @@ if __name__ == "__main__":
         print(leaf.value, code)
 
     tree.spread((on_node, on_leaf), '')
-    print(tree.layers)
\ No newline at end of file
+    print(tree.layers)
+
+    bench_array_tree()
+    bench_map_reduce()
@@ -1,38 +1,365 @@
 #!/usr/bin/env python3.10
 # coding: utf-8
 
+# Benchmark suite of huff.py
+#
+# Each case encodes then decodes a corpus: after some warmup runs, the median
+# of the timed runs gives the throughput, and one more run under tracemalloc
+# gives the peak of memory allocated by Python. Results are printed as JSON
+# (or written with --output) so two commits can be compared with --compare.
+# Nothing is written into the repository, files go to a temporary directory.
+
+
+from __future__ import annotations
+from argparse import ArgumentParser
+from codecs import encode as encode_text, decode as decode_text
+from datetime import datetime, timezone
+from json import dump, load
+from os import cpu_count, path
+from platform import platform, python_version
+from random import Random
+from statistics import median
+from subprocess import run
+from sys import stderr, stdout
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+import tracemalloc
 
-from timeit import timeit
 from huff import *
+import huff
 
 
-def encode():
-    with open("tour_du_monde.txt") as f1:
-        with open("tour_du_monde_compressed.bin", 'w', encoding="hfmn") as f2:
-            f2.write(f1.read())
+TEXT = path.join(path.dirname(path.abspath(__file__)), "tour_du_monde.txt")  # Bundled text corpus
+SEED = 2022  # Seed of the generated corpora
+SIZES = (10 ** 5, 10 ** 6, 10 ** 7, 10 ** 8)  # Corpus sizes in bytes (the largest one replicates the text up to 100 MB)
+WARMUP = 1  # Untimed runs before measuring
+REPEAT = 3  # Timed runs, the median is kept
+ADAPTIVE_MAX_SIZE = 10 ** 6  # The adaptive codec is too slow for larger corpora
+LIMITS_MAX_SIZE = 10 ** 6  # Maximal code lengths are compared up to this size
+LIMITS = (None, 15, 12, 10)  # Maximal code lengths compared
+WORKERS_MIN_SIZE = 10 ** 7  # Block-parallel compression is measured from this size
+STREAM_MAX_SIZE = 10 ** 7  # Writing line by line is measured up to this size
+# Probability of each byte of the skewed corpus out of 256: 1/2, 1/4, 1/8...
+SKEWED_TABLE = bytes(value for value, count in enumerate((128, 64, 32, 16, 8, 4, 2, 1, 1)) for _ in range(count))
+MEGA = 10 ** 6
 
 
-def decode():
-    with open("tour_du_monde_compressed.bin", "r", encoding="hfmn") as f1:
-        with open("tour_du_monde_uncompressed.txt", 'w') as f2:
-            f2.write(f1.read())
+#* Corpora here:
 
 
-print(f"Encoding took approximatly {timeit(encode, number=1)} ms")
-print(f"Decoding took approximatly {timeit(decode, number=1)} ms")
+def text_corpus(size: int) -> str:
+    """Replicate the bundled text
 
+    Args:
+        size (int): Number of characters
 
-def bench():
-    with open("tour_du_monde.txt") as file:
+    Returns:
+        str: The text
+    """
+    with open(TEXT, encoding=BYTES_ENCODING) as file:
         text = file.read()
-        return make_tree(text)
+    return (text * (size // len(text) + 1))[:size]
+
+
+def random_corpus(size: int) -> bytes:
+    """Generate uniform random bytes (nothing to compress)
+
+    Args:
+        size (int): Number of bytes
+
+    Returns:
+        bytes: The bytes
+    """
+    return Random(SEED).randbytes(size)
+
+
+def skewed_corpus(size: int) -> bytes:
+    """Generate random bytes of a geometric distribution (most codes are 1 or 2 bits)
+
+    Args:
+        size (int): Number of bytes
+
+    Returns:
+        bytes: The bytes
+    """
+    return random_corpus(size).translate(SKEWED_TABLE)
+
+
+#* Cases here:
+
+
+def measure(call: Callable, warmup: int, repeat: int) -> tuple[list[float], int]:
+    """Time a call and trace its memory
+
+    Args:
+        call (Callable): Something to call without arguments
+        warmup (int): Untimed runs
+        repeat (int): Timed runs
+
+    Returns:
+        tuple[list[float], int]: The time of each run in seconds and the peak of allocated bytes
+    """
+    for _ in range(warmup):
+        call()
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        call()
+        times.append(perf_counter() - start)
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def bench_case(name: str, raw: int, encode: Callable, decode: Callable, check: Callable, warmup: int, repeat: int) -> dict:
+    """Measure a couple of encoding and decoding calls
+
+    Args:
+        name (str): Identifier of the case, the same between commits
+        raw (int): Size of the corpus in bytes
+        encode (Callable): Something returning the encoded bytes
+        decode (Callable): Something decoding them
+        check (Callable): Something telling if the decoding is right
+
+    Raises:
+        AssertionError: If the decoding is wrong
+
+    Returns:
+        dict: The results
+    """
+    print(f"{name}...", end=' ', file=stderr, flush=True)
+    encoded = encode()
+    if not check():
+        raise AssertionError(f"{name}: wrong decoding")
+    encode_times, encode_peak = measure(encode, warmup, repeat)
+    decode_times, decode_peak = measure(decode, warmup, repeat)
+    headers = headers_size(encoded)
+    result = {
+        "name": name,
+        "size": raw,
+        "encoded_size": len(encoded),
+        "ratio": len(encoded) / raw,
+        "header_overhead": headers / len(encoded),
+        "encode_seconds": encode_times,
+        "decode_seconds": decode_times,
+        "encode_mbps": raw / median(encode_times) / MEGA,
+        "decode_mbps": raw / median(decode_times) / MEGA,
+        "encode_peak_bytes": encode_peak,
+        "decode_peak_bytes": decode_peak,
+    }
+    print(f"""encode {result["encode_mbps"]:.2f} MB/s, decode {result["decode_mbps"]:.2f} MB/s, ratio {result["ratio"]:.3f}""", file=stderr)
+    return result
+
+
+def codec_cases(text: str, warmup: int, repeat: int) -> list[dict]:
+    """Measure the codecs and the block-parallel compression on a text
+
+    Args:
+        text (str): The corpus
+
+    Returns:
+        list[dict]: The results
+    """
+    raw = len(text.encode(BYTES_ENCODING))
+    results = []
+    names = [CODEC_NAME, CODEC_CONTEXT_NAME]
+    if raw <= ADAPTIVE_MAX_SIZE:
+        names.append(CODEC_ADAPTIVE_NAME)
+    for codec in names:
+        encoded = encode_text(text, codec)
+        results.append(bench_case(
+            f"{codec}/text/{raw}", raw,
+            lambda: encode_text(text, codec),
+            lambda: decode_text(encoded, codec),
+            lambda: decode_text(encoded, codec) == text,
+            warmup, repeat))
+    if raw <= LIMITS_MAX_SIZE:
+        default = huff.MAX_CODE_LENGTH
+        try:
+            for limit in LIMITS:
+                huff.MAX_CODE_LENGTH = limit
+                encoded = encode_text(text, CODEC_NAME)
+                results.append(bench_case(
+                    f"{CODEC_NAME}/text/{raw}/limit={limit}", raw,
+                    lambda: encode_text(text, CODEC_NAME),
+                    lambda: decode_text(encoded, CODEC_NAME),
+                    lambda: decode_text(encoded, CODEC_NAME) == text,
+                    warmup, repeat))
+        finally:
+            huff.MAX_CODE_LENGTH = default
+    if raw >= WORKERS_MIN_SIZE:
+        workers = 2
+        while workers <= (cpu_count() or 1):
+            encoded = compress(text, workers)
+            results.append(bench_case(
+                f"compress/text/{raw}/workers={workers}", raw,
+                lambda: compress(text, workers),
+                lambda: decompress(encoded, workers),
+                lambda: decompress(encoded, workers) == text,
+                warmup, repeat))
+            workers *= 2
+    return results
+
+
+def file_cases(corpus: str, stdin: bytes, tmp: str, warmup: int, repeat: int) -> list[dict]:
+    """Measure the files and bytes compression
+
+    Args:
+        corpus (str): Name of the corpus
+        stdin (bytes): The corpus
+        tmp (str): A temporary directory
+
+    Returns:
+        list[dict]: The results
+    """
+    src, dst, out = (path.join(tmp, name) for name in ("src", "dst", "out"))
+    with open(src, "wb") as file:
+        file.write(stdin)
+
+    def encode() -> bytes:
+        compress_file(src, dst)
+        with open(dst, "rb") as file:
+            return file.read()
+
+    def check() -> bool:
+        decompress_file(dst, out)
+        with open(out, "rb") as file:
+            return file.read() == stdin
+
+    encoded = compress_bytes(stdin)
+    return [
+        bench_case(f"compress_file/{corpus}/{len(stdin)}", len(stdin), encode, lambda: decompress_file(dst, out), check, warmup, repeat),
+        bench_case(
+            f"compress_bytes/{corpus}/{len(stdin)}", len(stdin),
+            lambda: compress_bytes(stdin),
+            lambda: decompress_bytes(encoded),
+            lambda: decompress_bytes(encoded) == stdin,
+            warmup, repeat),
+    ]
+
+
+def stream_cases(text: str, tmp: str, warmup: int, repeat: int) -> list[dict]:
+    """Measure the codecs through io, writing the text line by line
+
+    Each write is a frame of its own, which references the table of a previous one
+    when it can: the ratio shows the cost of small writes next to codec_cases.
+
+    Args:
+        text (str): The corpus
+        tmp (str): A temporary directory
+
+    Returns:
+        list[dict]: The results
+    """
+    raw = len(text.encode(BYTES_ENCODING))
+    lines = text.splitlines(keepends=True)
+    dst = path.join(tmp, "stream")
+    results = []
+    for codec in (CODEC_NAME, CODEC_CONTEXT_NAME):
+
+        def encode() -> bytes:
+            with open(dst, 'w', encoding=codec, newline='') as file:
+                for line in lines:
+                    file.write(line)
+            with open(dst, "rb") as file:
+                return file.read()
+
+        def decode() -> str:
+            with open(dst, encoding=codec, newline='') as file:
+                return file.read()
+
+        results.append(bench_case(f"{codec}/stream/{raw}", raw, encode, decode, lambda: decode() == text, warmup, repeat))
+    return results
+
+
+def suite(sizes: list[int], warmup: int, repeat: int) -> list[dict]:
+    """Run every case on every size
+
+    Args:
+        sizes (list[int]): Corpus sizes in bytes
+        warmup (int): Untimed runs of each call
+        repeat (int): Timed runs of each call
+
+    Returns:
+        list[dict]: The results
+    """
+    results = []
+    with TemporaryDirectory() as tmp:
+        for size in sizes:
+            text = text_corpus(size).encode(BYTES_ENCODING)[:size].decode(BYTES_ENCODING, errors="ignore")  # Fit the size in bytes
+            text += ' ' * (size - len(text.encode(BYTES_ENCODING)))  # Fill a character cut in the middle
+            results += codec_cases(text, warmup, repeat)
+            if size <= STREAM_MAX_SIZE:
+                results += stream_cases(text, tmp, warmup, repeat)
+            results += file_cases("text", text.encode(BYTES_ENCODING), tmp, warmup, repeat)
+            results += file_cases("random", random_corpus(size), tmp, warmup, repeat)
+            results += file_cases("skewed", skewed_corpus(size), tmp, warmup, repeat)
+    return results
+
+
+#* Reports here:
+
+
+def revision() -> str | None:
+    """Get the current commit
+
+    Returns:
+        str | None: The commit hash or None out of a git repository
+    """
+    try:
+        process = run(["git", "rev-parse", "HEAD"], cwd=path.dirname(path.abspath(__file__)), capture_output=True, text=True)
+    except OSError:
+        return None
+    return process.stdout.strip() or None
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """Print the change of each case against a previous report
+
+    Args:
+        report (dict): The current report
+        baseline (dict): A previous report
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    print(f"""Against {baseline.get("revision")}:""", file=stderr)
+    for result in report["results"]:
+        if result["name"] not in previous:
+            continue
+        old = previous[result["name"]]
+        changes = ', '.join(f"{key} {result[key] / old[key] - 1:+.1%}" for key in ("encode_mbps", "decode_mbps", "ratio", "encode_peak_bytes", "decode_peak_bytes") if old[key])
+        print(f"""  {result["name"]}: {changes}""", file=stderr)
 
 
-text = "Hi everybody do the flop!"
-root = make_tree(text)
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark huff.py and report the results as JSON")
+    parser.add_argument("-s", "--sizes", type=int, nargs='+', default=SIZES, help="corpus sizes in bytes")
+    parser.add_argument("-w", "--warmup", type=int, default=WARMUP, help="untimed runs before measuring")
+    parser.add_argument("-r", "--repeat", type=int, default=REPEAT, help="timed runs (the median is reported)")
+    parser.add_argument("-o", "--output", help="JSON file written instead of printing")
+    parser.add_argument("-c", "--compare", help="JSON report of a previous run to compare with")
+    args = parser.parse_args()
 
-print(Node.from_tuple(root.to_tuple()))
-print(root.tree)
-print(root.to_tuple())
-print('\n'.join(map(repr, root.layers)))
-print(len(root))
+    report = {
+        "revision": revision(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": python_version(),
+        "platform": platform(),
+        "numpy": huff.bincount is not None,
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "results": suite(args.sizes, args.warmup, args.repeat),
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            dump(report, file, indent=4)
+    else:
+        dump(report, stdout, indent=4)
+        print()
+    if args.compare:
+        with open(args.compare) as file:
+            compare(report, load(file))
@@ -16,11 +16,23 @@
 
 
 from __future__ import annotations
-from collections import defaultdict
-from typing import Any, Generator, Iterable, Hashable
+from collections import Counter, defaultdict
+from typing import Any, BinaryIO, Generator, Iterable, Iterator, Hashable
 from codecs import CodecInfo, IncrementalEncoder, IncrementalDecoder, register
-from heapq import heapify, heappop, heappushpop
 from dataclasses import dataclass
+from io import BufferedIOBase
+from itertools import chain, islice
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from zlib import crc32
+from mmap import mmap, ACCESS_READ
+from os.path import getsize
+from array import array
+
+try:
+    from numpy import bincount, frombuffer, uint8
+except ImportError:  # NumPy is optional, counting fall back on Counter
+    bincount = None
 
 
 __version__ = "1.0.1"
@@ -39,11 +51,37 @@ X_INDENT = ' ' * X_SPACE
 X_STROKE = '─' * X_SPACE
 EOL = '\n'
 # For bytes manipulation
-BYTES_CODEMAP = 2
 BYTES_ORDER = "big"
 BYTES_ENCODING = "utf-8"
+BYTES_ERRORS = "surrogatepass"  # Lone surrogates are valid str values
+FORMAT_CANONICAL = 1  # Leading byte of a message storing canonical code lengths
+FORMAT_BYTES = 2  # Same for a message of bytes values
+FORMAT_ADAPTIVE = 3  # Leading byte of an adaptive stream
+FORMAT_TABLE = 4  # Leading byte of a message referencing a registered CodeMap
+FORMAT_CONTEXT = 5  # Leading byte of a message with a code map per previous character
+BYTES_TABLE_ID = 4
+BYTES_CRC = 4  # CRC32 ending each frame
+TABLES_CACHE = 64  # Decoded CodeMap kept in memory
+BLOCK_SIZE = 1 << 17  # Maximal number of values encoded in a frame
+MAX_CODE_LENGTH = 15  # Codes limit of the codec, None for unlimited (raised if the alphabet doesn't fit)
+# For bits packing
+ENCODE_BATCH = 4096  # Values packed at once into the bit accumulator
+DECODE_BITS = 12  # Bits peeked per table lookup (the table has 2 ** DECODE_BITS entries)
+REFILL_BYTES = 8  # Bytes loaded at once into the bit accumulator
+# For context modeling
+CONTEXT_MIN_COUNT = 64  # Occurrences required for a character to get its own following code map
+CONTEXT_MAX_VALUES = 256  # Larger alphabets fall back on a single code map
+CONTEXT_MAX_LENGTH = 15  # Codes limit (lengths are stored on 4 bits)
+CONTEXT_DECODE_BITS = 8  # Bits peeked per table lookup, there is a table per context
+# For adaptive coding
+ADAPTIVE_RAW_BITS = 21  # Bits of a new value (any unicode code point)
+ADAPTIVE_FLUSH = (1 << ADAPTIVE_RAW_BITS) - 1  # Pseudo value ending a flushed chunk, out of unicode
+ADAPTIVE_NYT = -1  # Value of the Not Yet Transmitted leaf
+ADAPTIVE_CHECKPOINT = 1 << 12  # Values counted between the copies of the tree an incremental decoder keeps
 # For codecs
 CODEC_NAME = "hfmn"
+CODEC_ADAPTIVE_NAME = "hfmn_adaptive"  # Also found as "hfmn-adaptive"
+CODEC_CONTEXT_NAME = "hfmn_context"
 
 
 #* Binary tree data structure and huffman algorithm here:
@@ -52,15 +90,22 @@ CODEC_NAME = "hfmn"
 class CodeMap():
     """A CodeMap mapping an hufftree
 
-    A simple implementation of encoding / decoding map.
+    A simple implementation of encoding / decoding map. Canonical maps of characters
+    or bytes can be serialized and registered, so messages only reference them by id.
     """
 
-    __encode_map: dict[Hashable, Hashable] = {}
-    __decode_map: dict[Hashable, Hashable] = {}
+    def __init__(self):
+        self.__encode_map: dict[Hashable, str] = {}
+        self.__decode_map: dict[str, Hashable] = {}
+        self.__decoder: tuple | None = None  # Decoding table, built on first decoding
+        self.__serialized: bytes | None = None  # Built on first serialization
 
     def __repr__(self) -> str:
         return f"""CodeMap({", ".join(f"{repr(value)} : 0b{code}" for value, code in self.__encode_map.items())})"""
 
+    def __contains__(self, value: Hashable) -> bool:
+        return value in self.__encode_map
+
     def __from_tuple__(self, value: tuple | Any, code: str) -> None:
         if isinstance(value, tuple):
             self.__from_tuple__(value[0], f"{code}0")
@@ -90,9 +135,116 @@ class CodeMap():
         code.__from_tuple__(root[1], '1')
         return code
 
+    @classmethod
+    def from_lengths(cls, lengths: dict[Hashable, int]) -> CodeMap:
+        """Build a canonical CodeMap
+
+        Args:
+            lengths (dict[Hashable, int]): The code length of each value
+
+        Returns:
+            CodeMap: The CodeMap of the canonical codes
+        """
+        code = cls()
+        for value, code_ in __canonical_codes__(__canonical_order__(lengths)).items():
+            code.__encode_map[value] = code_
+            code.__decode_map[code_] = value
+        return code
+
+    @classmethod
+    def from_codes(cls, values: Iterable[Hashable], codes: Iterable[int], lengths: Iterable[int]) -> CodeMap:
+        """Build a CodeMap from integer codes
+
+        Takes the parallel arrays given by pytree codes, or by any external encoder.
+
+        Args:
+            values (Iterable[Hashable]): The values
+            codes (Iterable[int]): The code of each value
+            lengths (Iterable[int]): The length in bits of each code
+
+        Returns:
+            CodeMap: The CodeMap of the codes
+        """
+        code = cls()
+        for value, bits, length in zip(values, codes, lengths):
+            code_ = format(bits, f"0{length}b")
+            code.__encode_map[value] = code_
+            code.__decode_map[code_] = value
+        return code
+
+    @classmethod
+    def train(cls, corpus: Iterable[Iterable[Hashable]]) -> CodeMap:
+        """Build a canonical CodeMap from some samples
+
+        Args:
+            corpus (Iterable[Iterable[Hashable]]): Samples like the messages to encode
+
+        Returns:
+            CodeMap: The CodeMap fitting the whole corpus
+        """
+        entropy_map = Counter()
+        for sample in corpus:
+            entropy_map.update(__entropy_map__(sample))
+        return cls.from_lengths(__code_lengths__(entropy_map))
+
+    @classmethod
+    def from_bytes(cls, stdin: bytes) -> CodeMap:
+        """Load a CodeMap serialized by to_bytes
+
+        Args:
+            stdin (bytes): The serialized CodeMap
+
+        Raises:
+            ValueError: If the data isn't a serialized CodeMap
+
+        Returns:
+            CodeMap: The canonical CodeMap
+        """
+        if not stdin or stdin[0] not in (FORMAT_CANONICAL, FORMAT_BYTES):
+            raise ValueError("not a serialized CodeMap")
+        ordered, pos = __unpack_header__(stdin, 1, __unpack_text__ if stdin[0] == FORMAT_CANONICAL else bytes)
+        if pos != len(stdin):
+            raise ValueError("trailing data after the CodeMap")
+        return cls.from_lengths(dict(ordered))
+
+    def to_bytes(self) -> bytes:
+        """Serialize the code lengths
+
+        Raises:
+            ValueError: If the map isn't canonical or map something else than characters or bytes
+
+        Returns:
+            bytes: The format byte and the header of a message using this map
+        """
+        if self.__serialized is None:
+            self.__serialized = self.__to_bytes__()
+        return self.__serialized
+
+    def __to_bytes__(self) -> bytes:
+        lengths = {value: len(code) for value, code in self.__encode_map.items()}
+        ordered = __canonical_order__(lengths)
+        if __canonical_codes__(ordered) != self.__encode_map:
+            raise ValueError("only canonical CodeMap can be serialized")
+        if all(isinstance(value, str) and len(value) == 1 for value in lengths):
+            return bytes((FORMAT_CANONICAL,)) + __pack_header__(ordered, __pack_text__)
+        if all(isinstance(value, int) and 0 <= value < 256 for value in lengths):
+            return bytes((FORMAT_BYTES,)) + __pack_header__(ordered, bytes)
+        raise ValueError("only characters or bytes can be serialized")
+
+    @property
+    def id(self) -> int:
+        """Get the id referencing the map in messages
+
+        Returns:
+            int: CRC32 of the serialized map
+        """
+        return crc32(self.to_bytes())
+
     def add(self, code: Hashable, value: Hashable) -> None:
         self.__encode_map[value] = code
         self.__decode_map[code] = value
+        self.__decoder = None
+        self.__serialized = None
 
     def encode(self, stdin: Iterable) -> bytes:
         """Encode some Iterable
@@ -103,16 +255,27 @@ class CodeMap():
         Returns:
             bytes: The encoded data
         """
-        stdout = "1"  # Need first bit to 1 to save the first 0 bits
-        for v in stdin:
-            stdout += self.__encode_map[v]
-        # Normalize to bytes format
-        length = 1 + len(stdout)
-        offset = 8 - length % 8
-        stdout = '0' * offset + stdout
-        length += offset
-        # Turn to bytes data
-        return int(stdout, 2).to_bytes(length // 8, byteorder=BYTES_ORDER)
+        return bytes(__encode_packed__(self.__encode_map, stdin))
+
+    def decode_chunks(self, stdin: bytes) -> list:
+        """Decode some bytes by windows
+
+        Args:
+            stdin (bytes): Some raw data
+
+        Returns:
+            list: The values of each window merged in a str for characters, in bytes for bytes and in a tuple else
+        """
+        if self.__decoder is None:
+            values = self.__encode_map.keys()
+            if values and all(isinstance(value, str) for value in values):
+                merge = ''.join
+            elif values and all(isinstance(value, int) and 0 <= value < 256 for value in values):
+                merge = bytes
+            else:
+                merge = tuple
+            self.__decoder = __decoder__([self.__decode_map], merge)
+        return __decode_packed__(self.__decoder, stdin)
 
     def decode(self, stdin: bytes) -> Generator:
         """Decode some bytes
@@ -123,13 +286,31 @@ class CodeMap():
         Returns:
             Generator: yield value of each value
         """
-        stdin = format(int.from_bytes(stdin, byteorder=BYTES_ORDER), "0b")  # Convert to binary string
-        b = ""  # Binary string buffer
-        for i in range(1, len(stdin)):  # Start after the first security bit
-            b += stdin[i]
-            if b in self.__decode_map:
-                yield self.__decode_map[b]
-                b = ""
+        for symbols in self.decode_chunks(stdin):
+            yield from symbols
+
+    def compress(self, stdin: str) -> bytes:
+        """Encode some text referencing this map
+
+        The map is registered, messages only hold its id. Blocks with a character
+        out of the map fall back on a message holding its own code lengths.
+
+        Args:
+            stdin (str): Some text
+
+        Returns:
+            bytes: The frames, decodable with the "hfmn" codec while the map is registered
+        """
+        header = bytes((FORMAT_TABLE,)) + register_table(self).to_bytes(BYTES_TABLE_ID, byteorder=BYTES_ORDER)
+        stdout = bytearray()
+        for i in range(0, len(stdin), BLOCK_SIZE):
+            block = stdin[i:i + BLOCK_SIZE]
+            if all(map(self.__contains__, set(block))):
+                message = header + __encode_packed__(self.__encode_map, block)
+            else:
+                message = __encode_block__(block)
+            stdout += __pack_frame__(message, len(block))
+        return bytes(stdout)
 
 
 @dataclass(frozen=True, eq=False, repr=False)
@@ -197,15 +378,6 @@ class Leaf(__TreeFragment):
         """
         return offset
 
-    def __layer__(self, layers: list[list], offset: int):
-        """Finally fill the layers
-
-        Args:
-            layers (list[list]): Layers list
-            offset (int): Current offset from the tree
-        """
-        layers[offset].append(self)
-
     def __code__(self, call: function, code: str) -> None:
         """Add code
 
@@ -277,20 +449,6 @@ class Node(__TreeFragment):
         self.left.__code__(call, f"{code}0")
         self.right.__code__(call, f"{code}1")
 
-    def __layer__(self, layers: list[list], offset: int):
-        """Recursively fill the layers
-
-        Args:
-            layers (list[list]): Layers list
-            offset (int): Current offset from the tree
-        """
-        layers[offset].append(self)
-        offset += 1
-        if offset == len(layers):
-            layers.append([])
-        self.left.__layer__(layers, offset)
-        self.right.__layer__(layers, offset)
-
     def __from_tuple__(value: tuple | Any) -> __TreeFragment:
         """Recursively build a hufftree from a tuple
 
@@ -327,10 +485,36 @@ class Node(__TreeFragment):
         Returns:
             list: The layers looking like this: [[Node], [Node, Leaf], ...]
         """
-        layers = [[self], []]
-        self.left.__layer__(layers, 1)
-        self.right.__layer__(layers, 1)
-        return layers
+        return list(self.iter_layers())
+
+    def iter_layers(self) -> Iterator[list]:
+        """Get his layers one at a time
+
+        Only the current layer is built, so stopping early doesn't touch the rest.
+
+        Yields:
+            Iterator[list]: The layers by depth
+        """
+        layer = [self]
+        while layer:
+            yield layer
+            layer = [child for fragment in layer if isinstance(fragment, Node) for child in (fragment.left, fragment.right)]
+
+    def layer_stats(self, max_depth: int | None = None) -> tuple[array, array]:
+        """Count the fragments and sum their weights layer by layer
+
+        Args:
+            max_depth (int | None, optional): Number of layers to look at. Defaults to None (all).
+
+        Returns:
+            tuple[array, array]: The number of fragments and the weight of each layer
+        """
+        counts = array('q')
+        weights = array('q')
+        for layer in islice(self.iter_layers(), max_depth):
+            counts.append(len(layer))
+            weights.append(sum(fragment.weight for fragment in layer))
+        return counts, weights
 
     @property
     def tree(self) -> str:
@@ -383,109 +567,1857 @@ class Node(__TreeFragment):
         return (self.left.to_tuple(), self.right.to_tuple())
 
 
-def make_tree(iterable: Iterable[Hashable]) -> Node:
+class HuffTree():
+    """An hufftree stored in parallel arrays
+
+    Leafs come first, sorted by weight, then nodes in creation order: each node
+    is after its children and the root is the last one. The Leaf & Node objects
+    are only built when something ask for them.
+
+    Args:
+        values (list[Hashable]): Value of each leaf
+        weights (list[int]): Weight of each leaf then each node
+        left (list[int]): Index of the left child of each node (-1 for leafs)
+        right (list[int]): Index of the right child of each node (-1 for leafs)
+    """
+
+    def __init__(self, values: list[Hashable], weights: list[int], left: list[int], right: list[int]):
+        self.values = values
+        self.weights = weights
+        self.left = left
+        self.right = right
+        self.__root = None
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    @classmethod
+    def from_entropy_map(cls, entropy_map: dict[Hashable, int], max_length: int | None = None) -> HuffTree:
+        """Build an hufftree from counted values
+
+        Leafs and nodes are both queues sorted by weight, so the 2 lightest
+        are always at their heads and no heap is needed.
+
+        Args:
+            entropy_map (dict[Hashable, int]): The number of occurrences of each value
+            max_length (int | None, optional): Maximal code length, the tree is rebuilt by package-merge if it's deeper. Defaults to None (unlimited).
+
+        Raises:
+            ValueError: If there is less than 2 values or too much to fit in max_length bits codes
+
+        Returns:
+            HuffTree: The tree
+        """
+        lenght = len(entropy_map)
+        if lenght < 2:
+            raise ValueError(f"require at least 2 different items ({lenght} given)")
+        if max_length is not None and 1 << max_length < lenght:
+            raise ValueError(f"can't fit {lenght} items in {max_length} bits codes")
+        items = sorted(entropy_map.items(), key=lambda item: item[1])
+        values = [value for value, _ in items]
+        weights = [weight for _, weight in items]
+        left = [-1] * lenght
+        right = [-1] * lenght
+        leaf = 0  # Head of the leafs queue
+        node = lenght  # Head of the nodes queue
+        for _ in range(1, lenght):
+            children = []
+            for _ in range(2):
+                if leaf < lenght and (node == len(weights) or weights[leaf] <= weights[node]):
+                    children.append(leaf)
+                    leaf += 1
+                else:
+                    children.append(node)
+                    node += 1
+            weights.append(weights[children[0]] + weights[children[1]])
+            left.append(children[0])
+            right.append(children[1])
+        tree = cls(values, weights, left, right)
+        if max_length is not None and tree.depth - 1 > max_length:
+            return cls.from_lengths(values, weights[:lenght], __limited_lengths__(weights[:lenght], max_length))
+        return tree
+
+    @classmethod
+    def from_lengths(cls, values: list[Hashable], weights: list[int], lengths: list[int]) -> HuffTree:
+        """Build an hufftree from code lengths
+
+        Values of each depth are paired from the deepest one, so the leafs get
+        exactly their code length.
+
+        Args:
+            values (list[Hashable]): Value of each leaf, sorted by weight
+            weights (list[int]): Weight of each leaf
+            lengths (list[int]): Code length of each leaf, filling a complete tree
+
+        Raises:
+            ValueError: If the lengths can't fill a complete tree
+
+        Returns:
+            HuffTree: The tree
+        """
+        weights = list(weights)
+        left = [-1] * len(values)
+        right = [-1] * len(values)
+        depths = defaultdict(list)
+        for i, length in enumerate(lengths):
+            depths[length].append(i)
+        level = []  # Nodes of the current depth
+        for depth in range(max(lengths), 0, -1):
+            level = depths[depth] + level
+            if len(level) % 2:
+                raise ValueError(f"odd number of codes of length {depth}")
+            nodes = []
+            for i in range(0, len(level), 2):
+                nodes.append(len(weights))
+                weights.append(weights[level[i]] + weights[level[i + 1]])
+                left.append(level[i])
+                right.append(level[i + 1])
+            level = nodes
+        if len(level) != 1:
+            raise ValueError("lengths don't fill a complete tree")
+        return cls(values, weights, left, right)
+
+    @property
+    def weight(self) -> int:
+        return self.weights[-1]
+
+    @property
+    def lengths(self) -> dict[Hashable, int]:
+        """Get the code length of each value
+
+        Returns:
+            dict[Hashable, int]: The depth of each leaf
+        """
+        depths = [0] * len(self.weights)
+        for i in range(len(self.weights) - 1, len(self.values) - 1, -1):
+            depths[self.left[i]] = depths[self.right[i]] = depths[i] + 1
+        return dict(zip(self.values, depths))
+
+    @property
+    def root(self) -> Node:
+        """Get the object tree
+
+        Build it on first access, children first so there is no recursion.
+
+        Returns:
+            Node: The root of the tree
+        """
+        if self.__root is None:
+            fragments = [Leaf(weight, value) for value, weight in zip(self.values, self.weights)]
+            for i in range(len(self.values), len(self.weights)):
+                fragments.append(Node(self.weights[i], fragments[self.left[i]], fragments[self.right[i]]))
+            self.__root = fragments[-1]
+        return self.__root
+
+    @property
+    def depth(self) -> int:
+        return max(self.lengths.values()) + 1  # Same as Node.depth
+
+    @property
+    def layers(self) -> list[list]:
+        return self.root.layers
+
+    def iter_layers(self) -> Iterator[list]:
+        return self.root.iter_layers()
+
+    def iter_layer_indexes(self) -> Iterator[list[int]]:
+        """Get the layers one at a time, as indexes of the arrays
+
+        Walks the arrays, the object tree isn't built and only the current layer is.
+
+        Yields:
+            Iterator[list[int]]: The fragments of each layer by depth, the values of the leafs are self.values[i]
+        """
+        left, right = self.left, self.right
+        layer = [len(self.weights) - 1]
+        while layer:
+            yield layer
+            layer = [child for i in layer if left[i] >= 0 for child in (left[i], right[i])]
+
+    def layer_stats(self, max_depth: int | None = None) -> tuple[array, array]:
+        """Count the fragments and sum their weights layer by layer
+
+        Walks the arrays, the object tree isn't built.
+
+        Args:
+            max_depth (int | None, optional): Number of layers to look at. Defaults to None (all).
+
+        Returns:
+            tuple[array, array]: The number of fragments and the weight of each layer
+        """
+        counts = array('q')
+        weights = array('q')
+        for layer in islice(self.iter_layer_indexes(), max_depth):
+            counts.append(len(layer))
+            weights.append(sum(self.weights[i] for i in layer))
+        return counts, weights
+
+    @property
+    def tree(self) -> str:
+        return self.root.tree
+
+    @property
+    def code(self) -> CodeMap:
+        return self.root.code
+
+    def to_tuple(self) -> tuple[tuple | Any]:
+        return self.root.to_tuple()
+
+
+def make_tree(iterable: Iterable[Hashable], max_length: int | None = None) -> HuffTree:
     """Generate Root of the Huffman Tree
 
-    Build an simple Huffman tree based on Leafs & Nodes
+    Build an simple Huffman tree based on parallel arrays,
+    the Leafs & Nodes are only built on demand.
 
     Args:
         iterable (Iterable[Hashable]): Something iterable with at least 2 hashable values
+        max_length (int | None, optional): Maximal code length. Defaults to None (unlimited).
 
     Returns:
-        Node: The root of the tree (wich is technicaly a node)
+        HuffTree: The tree
     """
-    entropy_map = defaultdict(int)
+    return HuffTree.from_entropy_map(__entropy_map__(iterable), max_length)
+
 
-    for k in iterable:
-        entropy_map[k] += 1
+def __limited_lengths__(weights: list[int], max_length: int) -> list[int]:
+    """Find optimal code lengths under a limit (package-merge)
 
-    lenght = len(entropy_map)
-    if lenght < 2:
-        raise ValueError(f"require at least 2 different items ({lenght} given)")
+    Each value is a coin of its weight for every denomination from 2 ** -max_length to 1/2.
+    Coins are packaged by pairs into the next denomination, merged with the fresh ones, and
+    the 2n - 2 lightest items of the last one are bought: the code length of a value is its
+    number of bought coins.
 
-    tree = [Leaf(v, k) for k, v in entropy_map.items()]
-    # Sum every time the 2 lightest node / leaf
-    heapify(tree)
-    left = heappop(tree)
-    for _ in range(2, lenght):
-        left = heappushpop(tree, left + heappop(tree))  # That just an optimization
-    return left + tree[0]
+    Args:
+        weights (list[int]): Weight of each value, sorted
+        max_length (int): Maximal code length
 
+    Returns:
+        list[int]: Code length of each value
+    """
+    lenght = len(weights)
+    levels = []  # Is package flags of each merged denomination, from the deepest one
+    items = list(weights)
+    for _ in range(1, max_length):
+        packages = [items[i] + items[i + 1] for i in range(0, len(items) - 1, 2)]
+        items = []
+        flags = []
+        leaf = package = 0
+        while leaf < lenght or package < len(packages):
+            if package == len(packages) or (leaf < lenght and weights[leaf] <= packages[package]):
+                items.append(weights[leaf])
+                flags.append(False)
+                leaf += 1
+            else:
+                items.append(packages[package])
+                flags.append(True)
+                package += 1
+        levels.append(flags)
+
+    lengths = [0] * lenght
+    bought = 2 * lenght - 2
+    for flags in reversed(levels):
+        packages = sum(flags[:bought])
+        for i in range(bought - packages):  # The fresh coins are the lightest values
+            lengths[i] += 1
+        bought = 2 * packages
+    for i in range(bought):  # Deepest denomination only have fresh coins
+        lengths[i] += 1
+    return lengths
+
+
+def __entropy_map__(iterable: Iterable[Hashable]) -> dict[Hashable, int]:
+    """Count each value
+
+    Bytes and ASCII text are counted in a single pass by NumPy when it's installed,
+    their values are always sorted so the tree doesn't depend on it.
 
-#* Codecs setup here:
+    Args:
+        iterable (Iterable[Hashable]): Something iterable with hashable values
 
+    Returns:
+        dict[Hashable, int]: The number of occurrences of each value
+    """
+    if isinstance(iterable, str) and iterable.isascii():
+        return {chr(k): v for k, v in __entropy_bytes__(iterable.encode("ascii")).items()}
+    if isinstance(iterable, (bytes, bytearray, memoryview)):
+        return __entropy_bytes__(iterable)
+    return Counter(iterable)
 
-def __encode__(stdin: str) -> bytes:
-    tree = make_tree(stdin)
-    root = str(tree.to_tuple()).encode(BYTES_ENCODING)
-    encode_map = {}
 
-    def __find_code__(code: str, value: Hashable) -> None:
-        encode_map[value] = code
+def __entropy_bytes__(stdin: bytes) -> dict[int, int]:
+    if bincount is None:
+        return dict(sorted(Counter(stdin).items()))
+    counts = bincount(frombuffer(stdin, dtype=uint8), minlength=256).tolist()
+    return {k: v for k, v in enumerate(counts) if v}
 
-    tree.__code__(__find_code__, '')
-    stdout = "1"  # Need first bit to 1 to save the first 0 bits
 
-    for v in stdin:
-        stdout += encode_map[v]
+#* Adaptive huffman here:
 
-    # Normalizing the binary string to bytes format
-    length = len(stdout)
-    offset = 8 - length % 8
-    stdout = '0' * offset + stdout
-    length += offset
 
-    return len(root).to_bytes(BYTES_CODEMAP, byteorder=BYTES_ORDER) + root + int(stdout, 2).to_bytes(length // 8, byteorder=BYTES_ORDER)
+class AdaptiveTree():
+    """An adaptive hufftree (FGK algorithm)
 
+    Encoder and decoder start from the same empty tree and update it the same way after
+    each value, so no table is ever sent. A new value is sent as the code of the NYT
+    (Not Yet Transmitted) leaf followed by ADAPTIVE_RAW_BITS raw bits.
 
-def __decode__(stdin: bytes) -> str:
-    code_len = int.from_bytes(stdin[0:BYTES_CODEMAP], byteorder=BYTES_ORDER) + BYTES_CODEMAP
-    decode_map = {}
+    Nodes are stored in parallel arrays and numbered from the root (0) by decreasing weight
+    (sibling property): a new node takes the next free number, so the NYT leaf is always the
+    last one and nothing is renumbered. The nodes of a weight have consecutive numbers, the
+    lowest one (the leader of the block) is kept by weight, so each update is O(depth).
+    """
 
-    def __find_code__(value: Any | tuple, code: str) -> None:
-        if isinstance(value, tuple):
-            __find_code__(value[0], f"{code}0")
-            __find_code__(value[1], f"{code}1")
+    def __init__(self):
+        self.weights = [0]
+        self.parents = [-1]
+        self.left = [-1]  # -1 for leafs
+        self.right = [-1]
+        self.values = [ADAPTIVE_NYT]
+        self.order = [0]  # Nodes by number
+        self.numbers = [0]  # Number of each node
+        self.leaders = {0: 0}  # Lowest number of each weight
+        self.leafs = {}  # Leaf of each value
+        self.nyt = 0
+
+    @property
+    def root(self) -> int:
+        return self.order[0]
+
+    def copy(self) -> AdaptiveTree:
+        """Copy the tree, to update one without the other
+
+        Returns:
+            AdaptiveTree: The same nodes in new arrays
+        """
+        tree = AdaptiveTree.__new__(AdaptiveTree)
+        tree.weights = self.weights.copy()
+        tree.parents = self.parents.copy()
+        tree.left = self.left.copy()
+        tree.right = self.right.copy()
+        tree.values = self.values.copy()
+        tree.order = self.order.copy()
+        tree.numbers = self.numbers.copy()
+        tree.leaders = self.leaders.copy()
+        tree.leafs = self.leafs.copy()
+        tree.nyt = self.nyt
+        return tree
+
+    def code(self, value: int) -> str:
+        """Get the code of a value then update the tree
+
+        Args:
+            value (int): Some value from 0 to ADAPTIVE_FLUSH
+
+        Returns:
+            str: The binary string code (behind the raw bits for a new value)
+        """
+        leaf = self.leafs.get(value)
+        bits = []
+        node = self.nyt if leaf is None else leaf
+        while node != self.root:
+            parent = self.parents[node]
+            bits.append('1' if self.right[parent] == node else '0')
+            node = parent
+        code = ''.join(reversed(bits))
+        if leaf is None:
+            code += format(value, f"0{ADAPTIVE_RAW_BITS}b")
+        self.update(value)
+        return code
+
+    def update(self, value: int) -> None:
+        """Count a value
+
+        Args:
+            value (int): Some value, new or not
+        """
+        weights, parents, order, leaders = self.weights, self.parents, self.order, self.leaders
+        node = self.leafs.get(value)
+        if node is None:
+            node = self.__split__(value)
+        while node != -1:
+            # Swap with the leader of its block, then leave the block for the next one
+            weight = weights[node]
+            number = leaders[weight]
+            leader = order[number]
+            parent = parents[node]
+            if leader == parent:
+                # Only when the sibling is the NYT leaf: the node goes right behind its parent, both grow
+                if order[number + 1] != node:
+                    self.__swap__(node, order[number + 1])
+                weights[node] += 1
+                node = parent
+                following = number + 2
+            else:
+                if leader != node:
+                    self.__swap__(node, leader)
+                following = number + 1
+            weights[node] += 1
+            leaders.setdefault(weight + 1, number)  # Else the heavier block ends right before
+            if following < len(order) and weights[order[following]] == weight:
+                leaders[weight] = following
+            else:
+                del leaders[weight]
+            node = parents[node]
+
+    def __split__(self, value: int) -> int:
+        """Give birth to a new leaf and a new NYT leaf from the NYT leaf
+
+        Args:
+            value (int): The new value
+
+        Returns:
+            int: The new leaf
+        """
+        parent = self.nyt
+        leaf = len(self.weights)
+        nyt = leaf + 1
+        self.weights += [0, 0]
+        self.parents += [parent, parent]
+        self.left += [-1, -1]
+        self.right += [-1, -1]
+        self.values += [value, ADAPTIVE_NYT]
+        self.left[parent] = nyt
+        self.right[parent] = leaf
+        self.values[parent] = None
+        self.numbers += [len(self.order), len(self.order) + 1]
+        self.order += [leaf, nyt]  # Next free numbers, the lowest weights
+        self.leafs[value] = leaf
+        self.nyt = nyt
+        return leaf
+
+    def __swap__(self, a: int, b: int) -> None:
+        """Swap 2 subtrees
+
+        Args:
+            a (int): A node
+            b (int): Another node, which isn't an ancestor of the first one
+        """
+        parent_a = self.parents[a]
+        parent_b = self.parents[b]
+        if parent_a == parent_b:
+            self.left[parent_a], self.right[parent_a] = self.right[parent_a], self.left[parent_a]
         else:
-            decode_map[code] = value
+            if self.left[parent_a] == a:
+                self.left[parent_a] = b
+            else:
+                self.right[parent_a] = b
+            if self.left[parent_b] == b:
+                self.left[parent_b] = a
+            else:
+                self.right[parent_b] = a
+            self.parents[a], self.parents[b] = parent_b, parent_a
+        number_a = self.numbers[a]
+        number_b = self.numbers[b]
+        self.order[number_a], self.order[number_b] = b, a
+        self.numbers[a], self.numbers[b] = number_b, number_a
 
-    tuple_ = eval(stdin[BYTES_CODEMAP:code_len])
-    __find_code__(tuple_[0], '0')
-    __find_code__(tuple_[1], '1')
 
-    stdin = format(int.from_bytes(stdin[code_len:], byteorder=BYTES_ORDER), "0b")  # Convert to binary string
-    stdout = ""
-    b = ""  # Binary string buffer
+#* Canonical codes here:
 
-    for i in range(1, len(stdin)):  # Start after the first security bit
-        b += stdin[i]
-        if b in decode_map:
-            stdout += decode_map[b]
-            b = ""
-    return stdout
 
+def __code_lengths__(entropy_map: dict[Hashable, int]) -> dict[Hashable, int]:
+    """Find the code length of each value
 
-class __IncrementalEncoder(IncrementalEncoder):
+    Args:
+        entropy_map (dict[Hashable, int]): The number of occurrences of each value
 
-    def encode(self, stdin: str) -> bytes:
-        return __encode__(stdin)
+    Returns:
+        dict[Hashable, int]: The depth of each value in the hufftree limited to MAX_CODE_LENGTH, a lone value get a 1 bit code
+    """
+    if len(entropy_map) < 2:
+        return dict.fromkeys(entropy_map, 1)
+    if MAX_CODE_LENGTH is None:
+        return HuffTree.from_entropy_map(entropy_map).lengths
+    max_length = max(MAX_CODE_LENGTH, (len(entropy_map) - 1).bit_length())
+    return HuffTree.from_entropy_map(entropy_map, max_length).lengths
 
 
-class __IncrementalDecoder(IncrementalDecoder):
+def __canonical_order__(lengths: dict[Hashable, int]) -> list[tuple[Hashable, int]]:
+    """Sort values by code length then by value
 
-    def decode(self, stdin: bytes, final: bool) -> str:
-        return __decode__(stdin)
+    Args:
+        lengths (dict[Hashable, int]): The code length of each value
+
+    Returns:
+        list[tuple[Hashable, int]]: Items like (value, length) in canonical order
+    """
+    return sorted(lengths.items(), key=lambda item: (item[1], item[0]))
 
 
-def __find_codec(encoding: str) -> CodecInfo | None:
-    if encoding != CODEC_NAME: return None
-    return CodecInfo(
-        name=CODEC_NAME,
-        encode=lambda stdin: (__encode__(stdin), 0),
-        decode=lambda stdin: (__decode__(stdin), 0),
-        incrementalencoder=__IncrementalEncoder,
-        incrementaldecoder=__IncrementalDecoder
-    )
+def __canonical_codes__(ordered: Iterable[tuple[Hashable, int]]) -> dict[Hashable, str]:
+    """Assign canonical codes
+
+    Each code is the previous one plus 1, shifted to its own length,
+    so the lengths in canonical order are enough to rebuild every code.
+
+    Args:
+        ordered (Iterable[tuple[Hashable, int]]): Items like (value, length) in canonical order
+
+    Returns:
+        dict[Hashable, str]: The binary string code of each value
+    """
+    codes = {}
+    code = 0
+    previous = 0
+    for value, length in ordered:
+        code <<= length - previous
+        codes[value] = format(code, f"0{length}b")
+        code += 1
+        previous = length
+    return codes
+
+
+def __pack_uint__(value: int) -> bytes:
+    """Pack an unsigned int in 7 bits groups (LEB128)
+
+    Args:
+        value (int): Some positive int
+
+    Returns:
+        bytes: The packed int, from 1 byte
+    """
+    stdout = bytearray()
+    while value > 0x7f:
+        stdout.append(value & 0x7f | 0x80)
+        value >>= 7
+    stdout.append(value)
+    return bytes(stdout)
+
+
+def __unpack_uint__(stdin: bytes, pos: int) -> tuple[int, int]:
+    """Unpack an unsigned int packed by __pack_uint__
+
+    Args:
+        stdin (bytes): Some raw data
+        pos (int): Position of the packed int
+
+    Raises:
+        ValueError: If the data end before the int
+
+    Returns:
+        tuple[int, int]: The int and the position following it
+    """
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(stdin):
+            raise ValueError("truncated data")
+        byte = stdin[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+
+def __pack_header__(ordered: list[tuple[Hashable, int]], pack: function) -> bytes:
+    """Pack canonical code lengths
+
+    The header is the maximal length on 1 byte, the number of codes of each length
+    and the packed values in canonical order behind their size.
+
+    Args:
+        ordered (list[tuple[Hashable, int]]): Items like (value, length) in canonical order
+        pack (function): Something to pack the values like that: pack(list) -> bytes
+
+    Returns:
+        bytes: The header
+    """
+    max_length = ordered[-1][1] if ordered else 0
+    counts = [0] * max_length
+    for _, length in ordered:
+        counts[length - 1] += 1
+    values = pack([value for value, _ in ordered])
+    return bytes((max_length,)) + b''.join(map(__pack_uint__, counts)) + __pack_uint__(len(values)) + values
+
+
+def __unpack_header__(stdin: bytes, pos: int, unpack: function) -> tuple[list[tuple[Hashable, int]], int]:
+    """Unpack canonical code lengths packed by __pack_header__
+
+    Args:
+        stdin (bytes): Some raw data
+        pos (int): Position of the header
+        unpack (function): Something to unpack the values like that: unpack(bytes) -> Sequence
+
+    Raises:
+        ValueError: If the header is truncated or inconsistent
+
+    Returns:
+        tuple[list[tuple[Hashable, int]], int]: Items like (value, length) in canonical order and the position following the header
+    """
+    if pos >= len(stdin):
+        raise ValueError("truncated data")
+    max_length = stdin[pos]
+    pos += 1
+    lengths = []
+    for length in range(1, max_length + 1):
+        count, pos = __unpack_uint__(stdin, pos)
+        lengths.extend([length] * count)
+    size, pos = __unpack_uint__(stdin, pos)
+    if pos + size > len(stdin):
+        raise ValueError("truncated data")
+    values = unpack(bytes(stdin[pos:pos + size]))
+    if len(values) != len(lengths):
+        raise ValueError(f"header declare {len(lengths)} codes ({len(values)} values given)")
+    return list(zip(values, lengths)), pos + size
+
+
+def __pack_text__(values: list[str]) -> bytes:
+    return ''.join(values).encode(BYTES_ENCODING, BYTES_ERRORS)
+
+
+def __unpack_text__(stdin: bytes) -> str:
+    return stdin.decode(BYTES_ENCODING, BYTES_ERRORS)
+
+
+#* Registered tables here:
+
+
+__tables: dict[int, bytes] = {}  # Serialized CodeMap by id
+
+
+def register_table(code: CodeMap) -> int:
+    """Register a canonical CodeMap
+
+    Args:
+        code (CodeMap): A canonical CodeMap of characters or bytes
+
+    Returns:
+        int: Its id
+    """
+    serialized = code.to_bytes()
+    table_id = crc32(serialized)
+    if __tables.get(table_id) != serialized:
+        __tables[table_id] = serialized
+        load_table.cache_clear()
+    return table_id
+
+
+@lru_cache(maxsize=TABLES_CACHE)
+def load_table(table_id: int) -> CodeMap:
+    """Get a registered CodeMap
+
+    The last used ones are kept with their decoding tables built.
+
+    Args:
+        table_id (int): Its id
+
+    Raises:
+        KeyError: If no CodeMap is registered with this id
+
+    Returns:
+        CodeMap: The CodeMap
+    """
+    if table_id not in __tables:
+        raise KeyError(f"unknown table {table_id:#010x}")
+    return CodeMap.from_bytes(__tables[table_id])
 
 
-register(__find_codec)
\ No newline at end of file
+def __message_map__(stdin: bytes, format_: int, unpack: function, stream: dict[int, CodeMap] | None = None) -> tuple[CodeMap, int]:
+    """Get the CodeMap of a message
+
+    Args:
+        stdin (bytes): A message
+        format_ (int): Format expected for a message holding its own code lengths
+        unpack (function): Something to unpack its values like that: unpack(bytes) -> Sequence
+        stream (dict[int, CodeMap] | None, optional): The last code lengths sent by the previous messages of the stream by id, looked up before the registered tables and updated. Defaults to None.
+
+    Raises:
+        ValueError: If the message is corrupted or references a table of other values
+        KeyError: If it references a table neither registered nor sent before in the stream
+
+    Returns:
+        tuple[CodeMap, int]: The CodeMap and the position of the packed bits
+    """
+    if not stdin:
+        raise ValueError("empty message")
+    if stdin[0] == FORMAT_TABLE:
+        pos = 1 + BYTES_TABLE_ID
+        if len(stdin) < pos:
+            raise ValueError("truncated data")
+        table_id = int.from_bytes(stdin[1:pos], byteorder=BYTES_ORDER)
+        code = stream[table_id] if stream and table_id in stream else load_table(table_id)
+        if code.to_bytes()[0] != format_:
+            raise ValueError(f"table doesn't map format {format_} values")
+        return code, pos
+    if stdin[0] != format_:
+        raise ValueError(f"unknown format {stdin[0]}")
+    ordered, pos = __unpack_header__(stdin, 1, unpack)
+    code = CodeMap.from_lengths(dict(ordered))
+    if stream is not None:
+        stream.clear()
+        stream[crc32(stdin[:pos])] = code  # Same id as once registered
+    return code, pos
+
+
+#* Bits packing here:
+
+
+def __encode_packed__(encode_map: dict[Hashable, str] | list[str], stdin: Iterable) -> bytearray:
+    """Pack the codes of some values
+
+    Args:
+        encode_map (dict[Hashable, str] | list[str]): The binary string code of each value (or indexed by byte)
+        stdin (Iterable): Some iterable data
+
+    Returns:
+        bytearray: The packed bits
+    """
+    stdout = bytearray()
+    for chunk in __encode_chunks__(encode_map.__getitem__, stdin):
+        stdout += chunk
+    return stdout
+
+
+def __encode_chunks__(code: function, stdin: Iterable) -> Generator:
+    """Pack the codes of some values chunk by chunk
+
+    Codes are joined by batch of ENCODE_BATCH values and pushed into an integer
+    accumulator, whole bytes are flushed right away so the memory only grows with the output.
+    The bits end by a "1" stop bit and zeros up to the byte boundary.
+
+    Args:
+        code (function): Something to find the binary string code of a value like that: code(value)
+        stdin (Iterable): Some iterable data
+
+    Returns:
+        Generator: yield the packed bytes of each batch
+    """
+    stdin = iter(stdin)
+    acc = 0
+    n = 0
+    while bits := ''.join(map(code, islice(stdin, ENCODE_BATCH))):
+        acc = (acc << len(bits)) | int(bits, 2)
+        n += len(bits)
+        rest = n & 7
+        yield (acc >> rest).to_bytes(n >> 3, byteorder=BYTES_ORDER)
+        acc &= (1 << rest) - 1
+        n = rest
+    # Stop bit then padding
+    acc = (acc << 1) | 1
+    n += 1
+    offset = -n % 8
+    yield (acc << offset).to_bytes((n + offset) >> 3, byteorder=BYTES_ORDER)
+
+
+def __decode_table__(decode_maps: list[dict[str, Any]], contexts: dict[Any, int] | None, bits: int, merge: function) -> list[list[tuple[Any, int, int]]]:
+    """Build multi-symbol decoding tables
+
+    Every entry maps a window of `bits` bits to every symbol fully contained in it,
+    so a single lookup can emit several symbols at once. With contexts, each
+    symbol is decoded by the code map of the previous one.
+
+    Args:
+        decode_maps (list[dict[str, Any]]): The binary string code of each value, for each context
+        contexts (dict[Any, int] | None): Index of the code map following each value, None for a single code map
+        bits (int): Size of the window
+        merge (function): Something to merge the symbols of a window like that: merge(tuple)
+
+    Returns:
+        list[list[tuple[Any, int, int]]]: For each context, entries like (merged symbols, consumed bits, next context), consumed bits is 0 if the first code is longer than the window
+    """
+    size = 1 << bits
+    firsts = []  # The first symbol of each window, for each context
+    for decode_map in decode_maps:
+        first = [(None, 0)] * size
+        for code, value in decode_map.items():
+            length = len(code)
+            if length <= bits:
+                start = int(code, 2) << (bits - length)
+                first[start:start + (1 << (bits - length))] = [(value, length)] * (1 << (bits - length))
+        firsts.append(first)
+
+    tables = []
+    for index in range(len(decode_maps)):
+        table = []
+        for window in range(size):
+            symbols = []
+            consumed = 0
+            context = index
+            while True:
+                # Shift the window to put the next code on top, the bottom is filled with 0 which are not consumed
+                value, length = firsts[context][(window << consumed) & (size - 1)]
+                if length == 0 or consumed + length > bits:
+                    break
+                symbols.append(value)
+                consumed += length
+                if contexts is not None:
+                    context = contexts[value]
+            table.append((merge(symbols), consumed, context))
+        tables.append(table)
+    return tables
+
+
+def __decoder__(decode_maps: list[dict[str, Any]], merge: function, contexts: dict[Any, int] | None = None) -> tuple | None:
+    """Prepare the decoding of some codes
+
+    Args:
+        decode_maps (list[dict[str, Any]]): The binary string code of each value, for each context
+        merge (function): Something to merge the symbols of a window like that: merge(tuple)
+        contexts (dict[Any, int] | None, optional): Index of the code map following each value. Defaults to None (a single code map).
+
+    Returns:
+        tuple | None: The window tables, their size, the value of each (length, code), the maximal length, merge and contexts (None without any code)
+    """
+    if not any(decode_maps):
+        return None
+    max_length = max(len(code) for decode_map in decode_maps for code in decode_map)
+    bits = min(DECODE_BITS if contexts is None else CONTEXT_DECODE_BITS, max_length)
+    long_maps = [{(len(code), int(code, 2)): value for code, value in decode_map.items()} for decode_map in decode_maps]
+    return __decode_table__(decode_maps, contexts, bits, merge), bits, long_maps, max_length, merge, contexts
+
+
+def __decode_bits__(decoder: tuple, stdin: bytes, acc: int, n: int, left: int, context: int = 0) -> list:
+    """Decode a bit stream with a table
+
+    Args:
+        decoder (tuple): Something prepared by __decoder__
+        stdin (bytes): The raw data following the bits already loaded
+        acc (int): Bit accumulator already loaded
+        n (int): Number of bits in the accumulator
+        left (int): Number of bits to decode (including the accumulator ones)
+        context (int, optional): Context of the first symbol. Defaults to 0.
+
+    Raises:
+        ValueError: If the bit stream doesn't end on a code
+
+    Returns:
+        list: The merged symbols, in order
+    """
+    tables, bits, long_maps, max_length, merge, contexts = decoder
+    mask = (1 << bits) - 1
+    # Zero padding let the loop peek over the end without any bound check
+    stdin = bytes(stdin) + bytes(max_length // 8 + 2 * REFILL_BYTES)
+    refill = REFILL_BYTES * 8
+    pos = 0
+    stdout = []
+    append = stdout.append
+
+    while left > 0:
+        while n < max_length:
+            acc = ((acc & ((1 << n) - 1)) << refill) | int.from_bytes(stdin[pos:pos + REFILL_BYTES], byteorder=BYTES_ORDER)
+            pos += REFILL_BYTES
+            n += refill
+        if left >= bits:
+            symbols, consumed, context = tables[context][(acc >> (n - bits)) & mask]
+            if consumed:
+                append(symbols)
+                n -= consumed
+                left -= consumed
+                continue
+        # Slow path for codes longer than the window and the last bits
+        long_map = long_maps[context]
+        for length in range(1, min(max_length, left) + 1):
+            key = (length, (acc >> (n - length)) & ((1 << length) - 1))
+            if key in long_map:
+                value = long_map[key]
+                append(merge((value,)))
+                n -= length
+                left -= length
+                if contexts is not None:
+                    context = contexts[value]
+                break
+        else:
+            raise ValueError(f"invalid code in the {left} last bits")
+    return stdout
+
+
+def __decode_packed__(decoder: tuple | None, stdin: bytes, context: int = 0) -> list:
+    """Decode bits packed by __encode_packed__
+
+    Args:
+        decoder (tuple | None): Something prepared by __decoder__
+        stdin (bytes): Raw data ending by the "1" stop bit and its zero padding
+        context (int, optional): Context of the first symbol. Defaults to 0.
+
+    Raises:
+        ValueError: If the stop bit is missing or a code is unknown
+
+    Returns:
+        list: The merged symbols, in order
+    """
+    if not stdin:
+        return []
+    last = stdin[-1]
+    if not last:
+        raise ValueError("missing stop bit")
+    left = 8 * len(stdin) - (last & -last).bit_length()  # Drop the stop bit and the padding after it
+    if not left:
+        return []
+    if decoder is None:
+        raise ValueError(f"{left} bits without any code")
+    return __decode_bits__(decoder, stdin, 0, 0, left, context)
+
+
+#* Context modeling here:
+
+
+def __pack_bitmap__(flags: Iterable[bool], size: int) -> bytes:
+    return sum(1 << i for i, flag in enumerate(flags) if flag).to_bytes((size + 7) // 8, byteorder=BYTES_ORDER)
+
+
+def __unpack_bitmap__(stdin: bytes, pos: int, size: int) -> tuple[list[int], int]:
+    end = pos + (size + 7) // 8
+    if end > len(stdin):
+        raise ValueError("truncated data")
+    bitmap = int.from_bytes(stdin[pos:end], byteorder=BYTES_ORDER)
+    return [i for i in range(size) if bitmap >> i & 1], end
+
+
+def __encode_context_block__(stdin: str) -> bytes:
+    """Encode a block as a self-contained message with order-1 contexts
+
+    Each character is coded by the code map of the previous one. Characters seen
+    less than CONTEXT_MIN_COUNT times share the default code map, which also code the first one.
+
+    The header is the alphabet (UTF-8 behind its size), a bitmap of the characters owning a code map,
+    then for each code map (the default first) a bitmap of its values and their code lengths on 4 bits.
+
+    Args:
+        stdin (str): Some text
+
+    Returns:
+        bytes: The message, a single code map one for large alphabets
+    """
+    values = sorted(set(stdin))
+    if len(values) > CONTEXT_MAX_VALUES:
+        return __encode_block__(stdin)
+    pairs = Counter(zip(chain(('',), stdin), stdin))  # Previous and current characters
+    totals = Counter()
+    for (previous, _), count in pairs.items():
+        totals[previous] += count
+    owners = [value for value in values if totals[value] >= CONTEXT_MIN_COUNT]
+    contexts = {value: i for i, value in enumerate(owners, 1)}
+    entropy_maps = [Counter() for _ in range(len(owners) + 1)]
+    for (previous, current), count in pairs.items():
+        entropy_maps[contexts.get(previous, 0)][current] += count
+
+    header = bytearray((FORMAT_CONTEXT,))
+    alphabet = __pack_text__(values)
+    header += __pack_uint__(len(alphabet)) + alphabet
+    header += __pack_bitmap__((value in contexts for value in values), len(values))
+    codes = []
+    for entropy_map in entropy_maps:
+        if len(entropy_map) < 2:
+            lengths = dict.fromkeys(entropy_map, 1)
+        else:
+            lengths = HuffTree.from_entropy_map(entropy_map, CONTEXT_MAX_LENGTH).lengths
+        header += __pack_bitmap__((value in lengths for value in values), len(values))
+        nibbles = [lengths[value] for value in values if value in lengths] + [0]
+        header += bytes(nibbles[i] << 4 | nibbles[i + 1] for i in range(0, len(nibbles) - 1, 2))
+        codes.append(__canonical_codes__(__canonical_order__(lengths)))
+
+    encode_map = {pair: codes[contexts.get(pair[0], 0)][pair[1]] for pair in pairs}
+    return bytes(header) + __encode_packed__(encode_map, zip(chain(('',), stdin), stdin))
+
+
+def __unpack_context_header__(stdin: bytes) -> tuple[list[dict[str, str]], dict[str, int], int]:
+    """Read the header of a message encoded by __encode_context_block__
+
+    Args:
+        stdin (bytes): A message
+
+    Raises:
+        ValueError: If the header is corrupted
+
+    Returns:
+        tuple[list[dict[str, str]], dict[str, int], int]: Decode maps, contexts and position of the packed bits
+    """
+    size, pos = __unpack_uint__(stdin, 1)
+    if pos + size > len(stdin):
+        raise ValueError("truncated data")
+    values = __unpack_text__(bytes(stdin[pos:pos + size]))
+    pos += size
+    owners, pos = __unpack_bitmap__(stdin, pos, len(values))
+    contexts = dict.fromkeys(values, 0)
+    for i, owner in enumerate(owners, 1):
+        contexts[values[owner]] = i
+    decode_maps = []
+    for _ in range(len(owners) + 1):
+        present, pos = __unpack_bitmap__(stdin, pos, len(values))
+        end = pos + (len(present) + 1) // 2
+        if end > len(stdin):
+            raise ValueError("truncated data")
+        nibbles = [length for byte in stdin[pos:end] for length in (byte >> 4, byte & 0xf)]
+        pos = end
+        lengths = {values[i]: length for i, length in zip(present, nibbles)}
+        decode_maps.append({code: value for value, code in __canonical_codes__(__canonical_order__(lengths)).items()})
+    return decode_maps, contexts, pos
+
+
+def __decode_context_block__(stdin: bytes) -> str:
+    """Decode a message encoded by __encode_context_block__
+
+    Args:
+        stdin (bytes): A message
+
+    Raises:
+        ValueError: If the message is corrupted
+
+    Returns:
+        str: The text
+    """
+    decode_maps, contexts, pos = __unpack_context_header__(stdin)
+    return ''.join(__decode_packed__(__decoder__(decode_maps, ''.join, contexts), stdin[pos:]))
+
+
+#* Codecs setup here:
+
+
+def __encode_block__(stdin: str) -> bytes:
+    """Encode a block as a self-contained message
+
+    Args:
+        stdin (str): Some text
+
+    Returns:
+        bytes: The format byte, the code lengths and the packed bits
+    """
+    ordered = __canonical_order__(__code_lengths__(__entropy_map__(stdin)))
+    return bytes((FORMAT_CANONICAL,)) + __pack_header__(ordered, __pack_text__) + __encode_packed__(__canonical_codes__(ordered), stdin)
+
+
+def __decode_block__(stdin: bytes, stream: dict[int, CodeMap] | None = None) -> str:
+    """Decode a message encoded by __encode_block__, CodeMap.compress or the incremental encoders
+
+    Args:
+        stdin (bytes): A message
+        stream (dict[int, CodeMap] | None, optional): The table sent by the previous messages, see __message_map__. Defaults to None.
+
+    Raises:
+        ValueError: If the message is corrupted
+
+    Returns:
+        str: The text
+    """
+    if stdin[:1] == bytes((FORMAT_CONTEXT,)):
+        return __decode_context_block__(stdin)
+    code, pos = __message_map__(stdin, FORMAT_CANONICAL, __unpack_text__, stream)
+    return ''.join(code.decode_chunks(stdin[pos:]))
+
+
+def __pack_frame__(message: bytes, length: int) -> bytes:
+    """Frame a message
+
+    A frame is the message size, the number of values it encodes, the message
+    and the CRC32 of the length and the message.
+
+    Args:
+        message (bytes): A message
+        length (int): Number of values encoded by the message
+
+    Returns:
+        bytes: The frame
+    """
+    body = __pack_uint__(length) + message
+    return __pack_uint__(len(message)) + body + crc32(body).to_bytes(BYTES_CRC, byteorder=BYTES_ORDER)
+
+
+def __next_frame__(stdin: bytes, pos: int) -> tuple[int, int, int] | None:
+    """Locate and check a frame
+
+    Args:
+        stdin (bytes): Some frames
+        pos (int): Position of the frame
+
+    Raises:
+        ValueError: If the frame is corrupted
+
+    Returns:
+        tuple[int, int, int] | None: Start and end of the message and number of values it encodes, None if the frame is incomplete
+    """
+    try:
+        size, body = __unpack_uint__(stdin, pos)
+        length, start = __unpack_uint__(stdin, body)
+    except ValueError:
+        return None  # Sizes aren't fully received yet
+    end = start + size
+    if end + BYTES_CRC > len(stdin):
+        return None
+    with memoryview(stdin) as view, view[body:end] as checked:
+        crc = crc32(checked)
+    if crc != int.from_bytes(stdin[end:end + BYTES_CRC], byteorder=BYTES_ORDER):
+        raise ValueError(f"corrupted frame at byte {pos}")
+    return start, end, length
+
+
+def __split_frames__(stdin: bytes) -> tuple[list[tuple[bytes, int]], int]:
+    """Split the complete frames
+
+    Args:
+        stdin (bytes): Some frames, the last one can be incomplete
+
+    Raises:
+        ValueError: If a frame is corrupted
+
+    Returns:
+        tuple[list[tuple[bytes, int]], int]: The messages of the complete frames with their number of values and the position following them
+    """
+    frames = []
+    pos = 0
+    while (frame := __next_frame__(stdin, pos)) is not None:
+        start, end, length = frame
+        frames.append((bytes(stdin[start:end]), length))
+        pos = end + BYTES_CRC
+    return frames, pos
+
+
+def __decode_frame__(frame: tuple[bytes, int], decode_block: function = __decode_block__) -> str | bytes:
+    """Decode a message and check its length
+
+    Args:
+        frame (tuple[bytes, int]): A message and its number of values
+        decode_block (function, optional): Something to decode the message. Defaults to __decode_block__.
+
+    Raises:
+        ValueError: If the message is corrupted
+
+    Returns:
+        str | bytes: The text (or bytes)
+    """
+    message, length = frame
+    stdout = decode_block(message)
+    if len(stdout) != length:
+        raise ValueError(f"{len(stdout)} values decoded instead of {length}")
+    return stdout
+
+
+def __encode__(stdin: str, encode_block: function = __encode_block__) -> bytes:
+    stdout = bytearray()
+    for i in range(0, len(stdin), BLOCK_SIZE):
+        block = stdin[i:i + BLOCK_SIZE]
+        stdout += __pack_frame__(encode_block(block), len(block))
+    return bytes(stdout)
+
+
+def __decode__(stdin: bytes) -> str:
+    frames, pos = __split_frames__(stdin)
+    if pos != len(stdin):
+        raise ValueError("truncated data")
+    decode_block = partial(__decode_block__, stream={})  # Frames can reference the table of a previous one
+    return ''.join(__decode_frame__(frame, decode_block) for frame in frames)
+
+
+def verify(stdin: bytes) -> int:
+    """Check the integrity of some frames without decoding them
+
+    Every frame CRC is checked, this runs at the speed of zlib.crc32. Works on
+    the output of the hfmn and hfmn_context codecs, compress and compress_file.
+
+    Args:
+        stdin (bytes): Some frames (anything supporting the buffer protocol like a mmap)
+
+    Raises:
+        ValueError: If a frame is corrupted or the last one is truncated
+
+    Returns:
+        int: Number of encoded values (characters or bytes)
+    """
+    total = 0
+    pos = 0
+    while pos < len(stdin):
+        frame = __next_frame__(stdin, pos)
+        if frame is None:
+            raise ValueError("truncated data")
+        total += frame[2]
+        pos = frame[1] + BYTES_CRC
+    return total
+
+
+def headers_size(stdin: bytes) -> int:
+    """Count the bytes of an encoded stream which aren't packed bits
+
+    That's the frames overhead (sizes, lengths and CRC) and the message headers
+    (the code lengths, a table id...) of the hfmn, hfmn_context codecs and
+    compress_file. An hfmn_adaptive stream only has its format byte.
+
+    Args:
+        stdin (bytes): Some frames or an adaptive stream
+
+    Raises:
+        ValueError: If the stream is corrupted
+
+    Returns:
+        int: Number of bytes
+    """
+    if stdin[:1] == bytes((FORMAT_ADAPTIVE,)):
+        return 1
+    frames, pos = __split_frames__(stdin)
+    if pos != len(stdin):
+        raise ValueError("truncated data")
+    size = pos - sum(len(message) for message, _ in frames)  # The frames overhead
+    for message, _ in frames:
+        if not message:
+            continue
+        if message[0] == FORMAT_TABLE:
+            size += 1 + BYTES_TABLE_ID
+        elif message[0] == FORMAT_CONTEXT:
+            size += __unpack_context_header__(message)[2]
+        elif message[0] == FORMAT_BYTES:
+            size += __unpack_header__(message, 1, bytes)[1]
+        else:
+            size += __unpack_header__(message, 1, __unpack_text__)[1]
+    return size
+
+
+class __IncrementalEncoder(IncrementalEncoder):
+    """Encode each call into its own frames
+
+    io.TextIOWrapper never set final and encodes each write, so every call flush its
+    own frames. Rather than repeating code lengths in each frame, a block whose characters
+    are all in the last table sent only holds its id (FORMAT_TABLE), unless a new table
+    built from every character counted so far is smaller. Such frames are decoded in order
+    (codecs.decode, io or the incremental decoder), not one by one. Each call still costs a
+    frame (sizes, table id and CRC32, about 12 bytes), so small writes stay larger than a single one.
+    """
+
+    def __init__(self, errors: str = "strict"):
+        super().__init__(errors)
+        self.reset()
+
+    def encode(self, stdin: str, final: bool = False) -> bytes:
+        stdout = bytearray()
+        for i in range(0, len(stdin), BLOCK_SIZE):
+            block = stdin[i:i + BLOCK_SIZE]
+            entropy_map = __entropy_map__(block)
+            self.counts.update(entropy_map)
+            stdout += __pack_frame__(self.__message__(block, entropy_map), len(block))
+        return bytes(stdout)
+
+    def __message__(self, stdin: str, entropy_map: dict[str, int]) -> bytes:
+        message, table = self.__table_message__(stdin, entropy_map)
+        if table is not None:
+            self.lengths, self.codes, self.reference = table
+        return message
+
+    def __table_message__(self, stdin: str, entropy_map: dict[str, int]) -> tuple[bytes, tuple | None]:
+        """Encode a block with the last table sent or a new one
+
+        Args:
+            stdin (str): Some text
+            entropy_map (dict[str, int]): Its number of occurrences of each character
+
+        Returns:
+            tuple[bytes, tuple | None]: The message and the new table (lengths, codes, reference header) if it holds one
+        """
+        size = None
+        if self.reference is not None and all(map(self.lengths.__contains__, entropy_map)):
+            size = len(self.reference) + (sum(count * self.lengths[value] for value, count in entropy_map.items()) + 8) // 8
+            if size <= len(self.counts):  # The characters alone of a new table's header take as much
+                return self.reference + __encode_packed__(self.codes, stdin), None
+        lengths = __code_lengths__(self.counts)
+        ordered = __canonical_order__(lengths)
+        header = bytes((FORMAT_CANONICAL,)) + __pack_header__(ordered, __pack_text__)
+        if size is not None and size <= len(header) + (sum(count * lengths[value] for value, count in entropy_map.items()) + 8) // 8:
+            return self.reference + __encode_packed__(self.codes, stdin), None
+        codes = __canonical_codes__(ordered)
+        reference = bytes((FORMAT_TABLE,)) + crc32(header).to_bytes(BYTES_TABLE_ID, byteorder=BYTES_ORDER)
+        return header + __encode_packed__(codes, stdin), (lengths, codes, reference)
+
+    def reset(self) -> None:
+        self.counts = Counter()  # Characters of the stream
+        self.lengths = {}  # Code lengths of the last table sent
+        self.codes = {}
+        self.reference = None  # Header of a message using the last table sent
+
+
+class __IncrementalContextEncoder(__IncrementalEncoder):
+    """Same as __IncrementalEncoder, order-1 contexts are used when smaller
+
+    Context code maps don't carry over between frames and a block needs a character
+    seen CONTEXT_MIN_COUNT times to get one, so small writes reference the last table sent.
+    """
+
+    def __message__(self, stdin: str, entropy_map: dict[str, int]) -> bytes:
+        message, table = self.__table_message__(stdin, entropy_map)
+        if max(entropy_map.values(), default=0) >= CONTEXT_MIN_COUNT:
+            context = __encode_context_block__(stdin)
+            if len(context) < len(message):
+                return context
+        if table is not None:
+            self.lengths, self.codes, self.reference = table
+        return message
+
+
+class __IncrementalDecoder(IncrementalDecoder):
+    """Decode the frames as they are complete
+
+    The state is the incomplete frame and the rank (from 1, 0 if none) of the last
+    table sent among the tables decoded, which io.TextIOWrapper stores in its tell()
+    cookies as a C int. Every table decoded is kept, so setstate can restore it.
+    """
+
+    def __init__(self, errors: str = "strict"):
+        super().__init__(errors)
+        self.pending = bytearray()  # Start of the incomplete frame
+        self.stream = {}  # Last table sent, see __message_map__
+        self.tables = []  # Every (id, table) decoded, kept by reset
+        self.ranks = {}  # Rank of every table decoded by id
+
+    def decode(self, stdin: bytes, final: bool = False) -> str:
+        self.pending += stdin
+        frames, pos = __split_frames__(self.pending)
+        del self.pending[:pos]
+        if final and self.pending:
+            raise ValueError("truncated data")
+        decode_block = partial(__decode_block__, stream=self.stream)
+        stdout = []
+        for frame in frames:
+            stdout.append(__decode_frame__(frame, decode_block))
+            for table_id, table in self.stream.items():
+                if table_id not in self.ranks:
+                    self.tables.append((table_id, table))
+                    self.ranks[table_id] = len(self.tables)
+        return ''.join(stdout)
+
+    def reset(self) -> None:
+        self.pending.clear()
+        self.stream.clear()
+
+    def getstate(self) -> tuple[bytes, int]:
+        return bytes(self.pending), self.ranks[next(iter(self.stream))] if self.stream else 0
+
+    def setstate(self, state: tuple[bytes, int]) -> None:
+        self.pending = bytearray(state[0])
+        self.stream.clear()
+        if state[1]:
+            table_id, table = self.tables[state[1] - 1]
+            self.stream[table_id] = table
+
+
+class __IncrementalAdaptiveEncoder(IncrementalEncoder):
+
+    def __init__(self, errors: str = "strict"):
+        super().__init__(errors)
+        self.reset()
+
+    def encode(self, stdin: str, final: bool = False) -> bytes:
+        if not stdin:
+            return b""
+        # io.TextIOWrapper never set final, so every call end by the flush value and its padding (stop bit included)
+        stdout = b"" if self.started else bytes((FORMAT_ADAPTIVE,))
+        self.started = True
+        return stdout + b''.join(__encode_chunks__(self.tree.code, chain(map(ord, stdin), (ADAPTIVE_FLUSH,))))
+
+    def reset(self) -> None:
+        self.tree = AdaptiveTree()
+        self.started = False
+
+
+class __IncrementalAdaptiveDecoder(IncrementalDecoder):
+    """Decode the bits as they come
+
+    The tree can't fit the C int io.TextIOWrapper keeps in its tell() cookies, so the state
+    is the rank of a walk position (values counted, node, raw bits, value, padding, started).
+    Every value counted is kept, with a copy of the tree every ADAPTIVE_CHECKPOINT values at
+    most: setstate copies the nearest tree back then counts the values behind it.
+    """
+
+    def __init__(self, errors: str = "strict"):
+        super().__init__(errors)
+        self.history = array('L')  # Every value counted since the start of the stream, kept by reset
+        self.checkpoints = {}  # Copy of the tree by values counted, kept by reset
+        self.reset()
+        self.positions = [self.__position__()]  # Walk positions by rank, the start first
+        self.ranks = {self.positions[0]: 0}
+
+    def decode(self, stdin: bytes, final: bool = False) -> str:
+        tree = self.tree
+        left, right, values = tree.left, tree.right, tree.values
+        stdout = []
+        for byte in stdin:
+            if not self.started:
+                if byte != FORMAT_ADAPTIVE:
+                    raise ValueError(f"unknown format {byte}")
+                self.started = True
+                continue
+            if self.padding:  # Flush value ended with the previous byte, this one is the stop bit and its padding
+                self.padding = False
+                continue
+            for shift in range(7, -1, -1):
+                bit = (byte >> shift) & 1
+                if self.raw:
+                    self.value = (self.value << 1) | bit
+                    self.raw -= 1
+                    if self.raw:
+                        continue
+                    value = self.value
+                else:
+                    self.node = right[self.node] if bit else left[self.node]
+                    value = values[self.node]
+                    if value is None:
+                        continue  # Still a node
+                    if value == ADAPTIVE_NYT:
+                        self.raw = ADAPTIVE_RAW_BITS
+                        self.value = 0
+                        continue
+                tree.update(value)
+                if self.count < len(self.history):
+                    self.history[self.count] = value
+                else:
+                    self.history.append(value)
+                self.count += 1
+                self.__start__()
+                if value == ADAPTIVE_FLUSH:
+                    self.padding = not shift  # Else the stop bit and padding fill this byte
+                    break
+                stdout.append(chr(value))
+        if final and self.started and (self.padding or self.raw or self.node != tree.root):
+            raise ValueError("truncated data")
+        return ''.join(stdout)
+
+    def __start__(self) -> None:
+        """Go back to the root, straight to the raw bits while the tree is only the NYT leaf
+        """
+        self.node = self.tree.root
+        self.raw = ADAPTIVE_RAW_BITS if self.tree.values[self.node] == ADAPTIVE_NYT else 0
+        self.value = 0
+
+    def __position__(self) -> tuple[int, int, int, int, bool, bool]:
+        return self.count, self.node, self.raw, self.value, self.padding, self.started
+
+    def reset(self) -> None:
+        self.tree = AdaptiveTree()
+        self.count = 0  # Values counted by the tree
+        self.checkpoint = 0  # Values counted by the last copy of the tree kept
+        self.started = False
+        self.padding = False
+        self.__start__()
+
+    def getstate(self) -> tuple[bytes, int]:
+        if self.count - self.checkpoint >= ADAPTIVE_CHECKPOINT:
+            self.checkpoint = self.count
+            self.checkpoints[self.count] = self.tree.copy()
+        position = self.__position__()
+        rank = self.ranks.setdefault(position, len(self.positions))
+        if rank == len(self.positions):
+            self.positions.append(position)
+        return b"", rank
+
+    def setstate(self, state: tuple[bytes, int]) -> None:
+        count, self.node, self.raw, self.value, self.padding, self.started = self.positions[state[1]]
+        if not self.count <= count <= self.count + ADAPTIVE_CHECKPOINT:
+            self.checkpoint = max((checkpoint for checkpoint in self.checkpoints if checkpoint <= count), default=0)
+            self.tree = self.checkpoints[self.checkpoint].copy() if self.checkpoint else AdaptiveTree()
+            self.count = self.checkpoint
+        for value in self.history[self.count:count]:
+            self.tree.update(value)
+        self.count = count
+
+
+def __find_codec(encoding: str) -> CodecInfo | None:
+    if encoding == CODEC_NAME:
+        return CodecInfo(
+            name=CODEC_NAME,
+            encode=lambda stdin: (__encode__(stdin), len(stdin)),
+            decode=lambda stdin: (__decode__(stdin), len(stdin)),
+            incrementalencoder=__IncrementalEncoder,
+            incrementaldecoder=__IncrementalDecoder
+        )
+    if encoding == CODEC_CONTEXT_NAME:
+        return CodecInfo(
+            name=CODEC_CONTEXT_NAME,
+            encode=lambda stdin: (__encode__(stdin, __encode_context_block__), len(stdin)),
+            decode=lambda stdin: (__decode__(stdin), len(stdin)),
+            incrementalencoder=__IncrementalContextEncoder,
+            incrementaldecoder=__IncrementalDecoder
+        )
+    if encoding == CODEC_ADAPTIVE_NAME:
+        return CodecInfo(
+            name=CODEC_ADAPTIVE_NAME,
+            encode=lambda stdin: (__IncrementalAdaptiveEncoder().encode(stdin, True), len(stdin)),
+            decode=lambda stdin: (__IncrementalAdaptiveDecoder().decode(stdin, True), len(stdin)),
+            incrementalencoder=__IncrementalAdaptiveEncoder,
+            incrementaldecoder=__IncrementalAdaptiveDecoder
+        )
+    return None
+
+
+register(__find_codec)
+
+
+#* Block-parallel compression here:
+
+
+def compress(stdin: str, workers: int | None = None) -> bytes:
+    """Encode some text on several processes
+
+    Each block of BLOCK_SIZE values is an independent frame, so the output is
+    the same as codecs.encode(stdin, "hfmn") whatever the number of workers.
+
+    Args:
+        stdin (str): Some text
+        workers (int | None, optional): Number of processes. Defaults to None (one per CPU).
+
+    Returns:
+        bytes: The frames
+    """
+    if workers == 1:
+        return __encode__(stdin)
+    stdout = bytearray()
+    with ProcessPoolExecutor(workers) as executor:
+        blocks = [stdin[i:i + BLOCK_SIZE] for i in range(0, len(stdin), BLOCK_SIZE)]
+        for block, message in zip(blocks, executor.map(__encode_block__, blocks)):
+            stdout += __pack_frame__(message, len(block))
+    return bytes(stdout)
+
+
+def decompress(stdin: bytes, workers: int | None = None) -> str:
+    """Decode some frames on several processes
+
+    Frames are decoded one by one, the ones written by the incremental encoders
+    can reference the table of a previous frame and need codecs.decode instead.
+
+    Args:
+        stdin (bytes): Some frames
+        workers (int | None, optional): Number of processes. Defaults to None (one per CPU).
+
+    Raises:
+        ValueError: If a frame is corrupted or the last one is truncated
+        KeyError: If a frame references a table sent by a previous frame
+
+    Returns:
+        str: The text
+    """
+    if workers == 1:
+        return __decode__(stdin)
+    frames, pos = __split_frames__(stdin)
+    if pos != len(stdin):
+        raise ValueError("truncated data")
+    with ProcessPoolExecutor(workers) as executor:
+        return ''.join(executor.map(__decode_frame__, frames))
+
+
+#* Bytes compression here:
+
+
+def __bytes_codes__(ordered: list[tuple[int, int]]) -> list[str]:
+    """Get the canonical codes of some bytes
+
+    Args:
+        ordered (list[tuple[int, int]]): Items like (byte, length) in canonical order
+
+    Returns:
+        list[str]: The binary string code indexed by byte
+    """
+    codes = [''] * 256  # Looked up by index, bytes are never hashed
+    for value, code in __canonical_codes__(ordered).items():
+        codes[value] = code
+    return codes
+
+
+def __encode_bytes_block__(stdin: bytes) -> tuple[bytes, list[str], int]:
+    """Prepare the message of a block of bytes
+
+    Args:
+        stdin (bytes): Some bytes
+
+    Returns:
+        tuple[bytes, list[str], int]: The format byte with the code lengths, the binary string code indexed by byte and the size of the packed bits
+    """
+    entropy_map = __entropy_bytes__(stdin)
+    lengths = __code_lengths__(entropy_map)
+    ordered = __canonical_order__(lengths)
+    codes = __bytes_codes__(ordered)
+    bits = sum(entropy_map[value] * length for value, length in lengths.items()) + 1  # With the stop bit
+    return bytes((FORMAT_BYTES,)) + __pack_header__(ordered, bytes), codes, (bits + 7) // 8
+
+
+def __decode_bytes_block__(stdin: bytes) -> bytes:
+    """Decode a message of bytes
+
+    Args:
+        stdin (bytes): A message
+
+    Raises:
+        ValueError: If the message is corrupted
+
+    Returns:
+        bytes: The bytes
+    """
+    code, pos = __message_map__(stdin, FORMAT_BYTES, bytes)
+    return b''.join(code.decode_chunks(stdin[pos:]))
+
+
+def __pack_bytes_frame__(stdin: bytes) -> bytes:
+    header, codes, _ = __encode_bytes_block__(stdin)
+    return __pack_frame__(header + __encode_packed__(codes, stdin), len(stdin))
+
+
+def compress_bytes(stdin: bytes) -> bytes:
+    """Encode some bytes
+
+    Same frames as compress_file.
+
+    Args:
+        stdin (bytes): Some bytes (anything supporting the buffer protocol)
+
+    Returns:
+        bytes: The frames
+    """
+    stdout = bytearray()
+    with memoryview(stdin) as view:
+        for i in range(0, len(view), BLOCK_SIZE):
+            with view[i:i + BLOCK_SIZE] as block:
+                stdout += __pack_bytes_frame__(block)
+    return bytes(stdout)
+
+
+def decompress_bytes(stdin: bytes) -> bytes:
+    """Decode some frames encoded by compress_bytes or compress_file
+
+    Args:
+        stdin (bytes): Some frames
+
+    Raises:
+        ValueError: If a frame is corrupted or the last one is truncated
+
+    Returns:
+        bytes: The bytes
+    """
+    frames, pos = __split_frames__(stdin)
+    if pos != len(stdin):
+        raise ValueError("truncated data")
+    return b''.join(__decode_frame__(frame, __decode_bytes_block__) for frame in frames)
+
+
+class HuffWriter(BufferedIOBase):
+    """A binary file encoding what is written into it
+
+    Written bytes are encoded by frames of BLOCK_SIZE bytes like compress_bytes,
+    flush encodes the incomplete block so everything written is decodable.
+    Closing the writer closes the underlying file.
+
+    Args:
+        raw (BinaryIO): The binary file receiving the frames
+    """
+
+    def __init__(self, raw: BinaryIO):
+        super().__init__()
+        self.raw = raw
+        self.pending = bytearray()  # Start of the incomplete block
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, stdin: bytes) -> int:
+        """Encode some bytes
+
+        Args:
+            stdin (bytes): Some bytes (anything supporting the buffer protocol)
+
+        Raises:
+            ValueError: If the file is closed
+
+        Returns:
+            int: Number of bytes written
+        """
+        if self.closed:
+            raise ValueError("write to closed file")
+        with memoryview(stdin) as view:
+            self.pending += view
+            size = view.nbytes
+        if len(self.pending) >= BLOCK_SIZE:
+            end = len(self.pending) - len(self.pending) % BLOCK_SIZE
+            with memoryview(self.pending) as view:
+                for i in range(0, end, BLOCK_SIZE):
+                    with view[i:i + BLOCK_SIZE] as block:
+                        self.raw.write(__pack_bytes_frame__(block))
+            del self.pending[:end]
+        return size
+
+    def flush(self) -> None:
+        if self.closed:
+            raise ValueError("flush of closed file")
+        if self.pending:
+            self.raw.write(__pack_bytes_frame__(self.pending))
+            self.pending.clear()
+        self.raw.flush()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            super().close()
+            self.raw.close()
+
+    def detach(self) -> BinaryIO:
+        self.flush()
+        raw = self.raw
+        self.raw = None
+        super().close()
+        return raw
+
+
+class HuffReader(BufferedIOBase):
+    """A binary file decoding what is read from it
+
+    It reads the frames written by HuffWriter, compress_bytes or compress_file.
+    Closing the reader closes the underlying file.
+
+    Args:
+        raw (BinaryIO): The binary file holding the frames
+    """
+
+    def __init__(self, raw: BinaryIO):
+        super().__init__()
+        self.raw = raw
+        self.pending = bytearray()  # Start of the incomplete frame
+        self.decoded = bytearray()  # Decoded bytes not read yet
+
+    def readable(self) -> bool:
+        return True
+
+    def __fill__(self, size: int) -> None:
+        # Decode frames until size bytes are available or the end of the file (size < 0)
+        while size < 0 or len(self.decoded) < size:
+            chunk = self.raw.read(BLOCK_SIZE)
+            if not chunk:
+                if self.pending:
+                    raise ValueError("truncated data")
+                return
+            self.pending += chunk
+            frames, pos = __split_frames__(self.pending)
+            del self.pending[:pos]
+            for frame in frames:
+                self.decoded += __decode_frame__(frame, __decode_bytes_block__)
+
+    def __take__(self, size: int) -> bytes:
+        if size < 0 or size >= len(self.decoded):
+            stdout = bytes(self.decoded)
+            self.decoded.clear()
+        else:
+            stdout = bytes(self.decoded[:size])
+            del self.decoded[:size]
+        return stdout
+
+    def read(self, size: int | None = -1) -> bytes:
+        """Read some decoded bytes
+
+        Args:
+            size (int | None, optional): Maximal number of bytes. Defaults to -1 (until the end of the file).
+
+        Raises:
+            ValueError: If the file is closed or a frame is corrupted
+
+        Returns:
+            bytes: The bytes, empty at the end of the file
+        """
+        if self.closed:
+            raise ValueError("read of closed file")
+        size = -1 if size is None else size
+        self.__fill__(size)
+        return self.__take__(size)
+
+    def read1(self, size: int = -1) -> bytes:
+        if self.closed:
+            raise ValueError("read of closed file")
+        if not self.decoded:
+            self.__fill__(1)
+        return self.__take__(size)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        self.raw.close()
+
+    def detach(self) -> BinaryIO:
+        raw = self.raw
+        self.raw = None
+        super().close()
+        return raw
+
+
+#* Files compression here:
+
+
+def compress_file(src: str, dst: str) -> None:
+    """Encode a file of any kind
+
+    The source is mapped in memory and encoded by frames of BLOCK_SIZE bytes. Each
+    frame size is known once its bytes are counted, so the destination is
+    allocated at its final size and mapped too: the data is never copied in between.
+    Only the header and the payload size of each block are kept from this first
+    pass, the codes are rebuilt from the header in the second one.
+
+    Args:
+        src (str): Path of the file to encode
+        dst (str): Path of the encoded file
+    """
+    size = getsize(src)
+    with open(src, "rb") as file_in, open(dst, "w+b") as file_out:
+        if not size:
+            return  # Nothing to map
+        with mmap(file_in.fileno(), 0, access=ACCESS_READ) as stdin, memoryview(stdin) as view:
+            total = 0
+            blocks = []  # Header and payload size of each block, kept for the writing pass
+            for i in range(0, size, BLOCK_SIZE):
+                with view[i:i + BLOCK_SIZE] as block:
+                    header, _, payload = __encode_bytes_block__(block)
+                    blocks.append((header, payload))
+                    total += len(__pack_uint__(len(header) + payload)) + len(__pack_uint__(len(block))) + len(header) + payload + BYTES_CRC
+            file_out.truncate(total)
+            with mmap(file_out.fileno(), total) as stdout:
+                pos = 0
+                for i, (header, payload) in zip(range(0, size, BLOCK_SIZE), blocks):
+                    codes = __bytes_codes__(__unpack_header__(header, 1, bytes)[0])
+                    with view[i:i + BLOCK_SIZE] as block:
+                        size_ = __pack_uint__(len(header) + payload)
+                        stdout[pos:pos + len(size_)] = size_
+                        pos += len(size_)
+                        crc = 0  # Of the length and the message
+                        for chunk in (__pack_uint__(len(block)), header, *__encode_chunks__(codes.__getitem__, block)):
+                            stdout[pos:pos + len(chunk)] = chunk
+                            crc = crc32(chunk, crc)
+                            pos += len(chunk)
+                        stdout[pos:pos + BYTES_CRC] = crc.to_bytes(BYTES_CRC, byteorder=BYTES_ORDER)
+                        pos += BYTES_CRC
+
+
+def decompress_file(src: str, dst: str) -> None:
+    """Decode a file encoded by compress_file
+
+    The source is mapped in memory and decoded frame by frame.
+
+    Args:
+        src (str): Path of the encoded file
+        dst (str): Path of the decoded file
+
+    Raises:
+        ValueError: If a frame is corrupted or the last one is truncated
+    """
+    size = getsize(src)
+    with open(src, "rb") as file_in, open(dst, "wb") as file_out:
+        if not size:
+            return  # Nothing to map
+        with mmap(file_in.fileno(), 0, access=ACCESS_READ) as stdin:
+            pos = 0
+            while pos < size:
+                frame = __next_frame__(stdin, pos)
+                if frame is None:
+                    raise ValueError("truncated data")
+                start, end, length = frame
+                file_out.write(__decode_frame__((stdin[start:end], length), __decode_bytes_block__))
+                pos = end + BYTES_CRC
+
+
+def verify_file(src: str) -> int:
+    """Check the integrity of a file encoded by compress_file without decoding it
+
+    Args:
+        src (str): Path of the encoded file
+
+    Raises:
+        ValueError: If a frame is corrupted or the last one is truncated
+
+    Returns:
+        int: Size of the decoded file
+    """
+    if not getsize(src):
+        return 0  # Nothing to map
+    with open(src, "rb") as file, mmap(file.fileno(), 0, access=ACCESS_READ) as stdin:
+        return verify(stdin)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3.10
+# coding: utf-8
+
+# Regression tests of huff.py, run with: python -m unittest discover -s huffman
+
+
+import codecs
+from os import path
+from tempfile import TemporaryDirectory
+import unittest
+
+import huff  # noqa: F401, registers the codecs
+
+
+LINES = [f"{'abcdefgh'[i % 8] * (i % 13 + 1)} ligne {i}: {chr(0x3b1 + i % 20) * (i % 7)}\n" for i in range(300)]
+
+
+class TestIncrementalDecoder(unittest.TestCase):
+
+    def test_tell_seek(self):
+        with TemporaryDirectory() as tmp:
+            for encoding in ("hfmn", "hfmn_context"):
+                src = path.join(tmp, encoding)
+                with open(src, "w", encoding=encoding, newline="") as file:
+                    for line in LINES:
+                        file.write(line)
+                        file.flush()  # A frame per line, most referencing the last table sent
+                with self.subTest(encoding), open(src, encoding=encoding, newline="") as file:
+                    marks = []
+                    for line in LINES:
+                        marks.append(file.tell())
+                        self.assertEqual(file.readline(), line)
+                    for i in range(len(LINES) - 1, -1, -7):
+                        file.seek(marks[i])
+                        self.assertEqual(file.readline(), LINES[i])
+
+    def test_state_replay(self):
+        encoder = codecs.getincrementalencoder("hfmn")()
+        data = b"".join(encoder.encode(line) for line in LINES) + encoder.encode("", final=True)
+        decoder = codecs.getincrementaldecoder("hfmn")()
+        first = decoder.decode(data[:len(data) // 3])
+        state = decoder.getstate()
+        second = decoder.decode(data[len(data) // 3:])
+        self.assertEqual(first + second, "".join(LINES))
+        decoder.setstate(state)
+        self.assertEqual(decoder.decode(data[len(data) // 3:], final=True), second)
+
+    def test_adaptive_tell_seek(self):
+        with TemporaryDirectory() as tmp:
+            src = path.join(tmp, "hfmn_adaptive")
+            with open(src, "w", encoding="hfmn_adaptive", newline="") as file:
+                for i in range(0, len(LINES), 100):
+                    file.write("".join(LINES[i:i + 100]))
+            with open(src, encoding="hfmn_adaptive", newline="") as file:
+                head = file.read(1000)
+                position = file.tell()
+                tail = file.read()
+                self.assertEqual(head + tail, "".join(LINES))
+                file.seek(position)
+                self.assertEqual(file.read(), tail)
+                file.seek(0)
+                marks = [(file.tell(), file.readline()) for _ in range(20)]
+                for position, line in reversed(marks):
+                    file.seek(position)
+                    self.assertEqual(file.readline(), line)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,10 +12,18 @@
 
 
 from __future__ import annotations
-from typing import Any, Iterable, Callable
-from dataclasses import dataclass
-from collections import defaultdict
+from typing import Any, Iterable, Iterator, Callable, TextIO
+from dataclasses import dataclass, field
+from collections import Counter
 from heapq import heapify, heappop, heappushpop
+from itertools import islice
+from array import array
+from bisect import bisect_left
+from struct import Struct
+from mmap import mmap, ACCESS_READ
+from sys import byteorder
+from os import cpu_count
+from concurrent.futures import Executor
 
 
 __version__ = "1.0.0"
@@ -32,6 +40,18 @@ X_SPACE = 2
 Y_SPACE = 0
 X_INDENT = ' ' * X_SPACE
 X_STROKE = '─' * X_SPACE
+ELLIPSIS = '…'  # Mark of the truncated parts
+MAP_TASKS = 4  # Subtrees per cpu when map_reduce chooses where to split
+RECURSION_DEPTH = 256  # Layers walked by recursion, deeper subtrees go on an explicit stack
+
+# For binary serialization
+TREE_MAGIC = b"PYTR"  # First bytes of a serialized tree
+TREE_VERSION = 1
+TREE_HEADER = Struct("<4sBB2xQQ")  # Magic, version, flags, number of nodes and leafs
+TREE_BINARY = 1  # Flag of a BinNode tree
+TREE_ALIGN = 8  # Sections start on a multiple of 8 bytes, so arrays can be cast in place
+VALUE_TYPES = (type(None), bool, int, float, str, bytes)  # Types of serializable values, the index is the tag
+FLOAT = Struct("<d")
 
 
 # * Error class
@@ -48,6 +68,8 @@ class ChildError(Exception):
 @dataclass(eq=False, repr=False)
 class __Fragment:
 
+    __slots__ = ()  # Concrete fragments declare the slots, a list subclass can't share a non-empty layout
+
     weight: int
 
     def __lt__(self, fragment: __Fragment) -> bool:
@@ -91,6 +113,21 @@ class __Fragment:
         """
         return f"{self.__class__.__name__}(w={self.weight})"
 
+    def to_bytes(self) -> bytes:
+        """Serialize the tree
+
+        See TreeView for the format, weights must be 64 bits int and values None,
+        bool, int, float, str or bytes.
+
+        Raises:
+            ChildError: If a Node has no children
+            TypeError: If a value can't be serialized
+
+        Returns:
+            bytes: The tree in binary
+        """
+        return __dump__(self)
+
 
 @dataclass(repr=False)
 class __LeafFragment(__Fragment):
@@ -104,6 +141,8 @@ class __LeafFragment(__Fragment):
         value (Any): Self value
     """
 
+    __slots__ = ()
+
     value: Any
 
     def __len__(self) -> int:
@@ -117,7 +156,7 @@ class __LeafFragment(__Fragment):
     def __tree__(self, offset: str) -> str:
         return f""" {self.weight} {X_STROKE}╼ {repr(self.value)}"""
 
-    def __code__(self, call: Callable, code: str) -> None:
+    def __code__(self, call: Callable, code: str, depth: int = RECURSION_DEPTH) -> None:
         call(self.value, code)
 
     def __depth__(self, offset: int) -> int:
@@ -126,6 +165,9 @@ class __LeafFragment(__Fragment):
     def __layer__(self, layers: list[list], offset: int):
         layers[offset].append(self)
 
+    def __children__(self) -> tuple:
+        return ()
+
     def to_tuple(self) -> Any:
         """Turn itself into a tuple
 
@@ -147,9 +189,19 @@ class __LeafFragment(__Fragment):
         """
         return calls[1](self, *args)
 
+    def map_reduce(self, leaf_fn: Callable, combine_fn: Callable, executor: Executor | None = None, depth: int | None = None) -> Any:
+        """Reduce the tree with leaf_fn, see __NodeFragment.map_reduce
+
+        Returns:
+            Any: Anything returned by leaf_fn(self)
+        """
+        return leaf_fn(self)
+
 
 class __NodeFragment:
 
+    __slots__ = ()
+
     @property
     def depth(self) -> int:
         """Depth of node
@@ -166,7 +218,7 @@ class __NodeFragment:
         Returns:
             str: A visual tree
         """
-        return self.__tree__('')
+        return '\n'.join(self.lines())
 
     @property
     def layers(self) -> list[list]:
@@ -175,9 +227,201 @@ class __NodeFragment:
         Returns:
             list[list]: List of layers by depth
         """
-        layers = [[]]
-        self.__layer__(layers, 0)
-        return layers
+        return list(__levels__(self))
+
+    def iter_layers(self) -> Iterator[list]:
+        """Get each layers of a tree, one at a time
+
+        Only the current layer is built, so stopping early doesn't touch the rest.
+
+        Returns:
+            Iterator[list]: Layers by depth
+        """
+        return __levels__(self)
+
+    def layer_stats(self, max_depth: int | None = None) -> tuple[array, array | list]:
+        """Count the fragments and sum their weights layer by layer
+
+        Args:
+            max_depth (int | None, optional): Number of layers to look at, None for all. Defaults to None.
+
+        Returns:
+            tuple[array, array | list]: The number of fragments and the weight of each layer (an array of int64 when possible)
+        """
+        counts = array('q')
+        weights = []
+        for layer in islice(__levels__(self), max_depth):
+            counts.append(len(layer))
+            weights.append(sum(fragment.weight for fragment in layer))
+        return counts, ArrayTree.__weights__(weights)
+
+    def __tree__(self, offset: str) -> str:
+        return '\n'.join(self.__lines__(offset, None, None))
+
+    def __lines__(self, offset: str, max_depth: int | None, max_width: int | None) -> Iterator[str]:
+        # Pre-order with a stack of (fragment or hidden count, depth, offset of the parent, line head, children offset)
+        stack = [(self, 1, None, '', offset)]
+        pop, push = stack.pop, stack.append
+        while stack:
+            fragment, depth, parent, head, offset = pop()
+            if Y_SPACE and parent is not None:
+                for _ in range(Y_SPACE):
+                    yield f"{parent}│"
+            if isinstance(fragment, int):
+                yield f"{head} {ELLIPSIS} {fragment} more"
+            elif not isinstance(fragment, (BinNode, Node)):
+                yield f"{head}{fragment.__tree__(offset)}"
+            elif depth == max_depth:
+                yield f"{head}┮ {fragment.weight} {ELLIPSIS}"
+            else:
+                yield f"{head}┮ {fragment.weight}"
+                children = fragment.__children__()
+                if max_width is not None and len(children) > max_width:
+                    push((len(children) - max_width, depth + 1, offset, f"{offset}└{X_STROKE}", None))
+                    children = children[:max_width]
+                    last = None  # The hidden count is the last line
+                else:
+                    last = len(children) - 1
+                depth += 1
+                head, indent = f"{offset}├{X_STROKE}", f"{offset}│{X_INDENT}"  # Shared by the children but the last
+                for i in range(len(children) - 1, -1, -1):  # Reversed to pop the first child first
+                    if i == last:
+                        push((children[i], depth, offset, f"{offset}└{X_STROKE}", f"{offset} {X_INDENT}"))
+                    else:
+                        push((children[i], depth, offset, head, indent))
+
+    def lines(self, max_depth: int | None = None, max_width: int | None = None) -> Iterator[str]:
+        """Render the visual tree line by line
+
+        Lines are built while iterating, so a huge tree starts printing at once and
+        the memory only depends on its depth.
+
+        Args:
+            max_depth (int | None, optional): Number of layers shown, deeper nodes are marked by an ellipsis. Defaults to None (all).
+            max_width (int | None, optional): Children shown per node, the others are counted on a last line. Defaults to None (all).
+
+        Returns:
+            Iterator[str]: Each line of the visual tree
+        """
+        return self.__lines__('', max_depth, max_width)
+
+    def write(self, file: TextIO, max_depth: int | None = None, max_width: int | None = None) -> None:
+        """Write the visual tree into a file line by line
+
+        Args:
+            file (TextIO): A text file
+            max_depth (int | None, optional): Number of layers shown. Defaults to None (all).
+            max_width (int | None, optional): Children shown per node. Defaults to None (all).
+        """
+        file.writelines(f"{line}\n" for line in self.__lines__('', max_depth, max_width))
+
+    def __stack_code__(self, call: Callable, code: str) -> None:
+        # Pre-order with a stack of fragments and a parallel stack of their code, for any depth
+        stack = [self]
+        codes = [code]
+        pop, push, pop_code, push_code = stack.pop, stack.append, codes.pop, codes.append
+        while stack:
+            fragment = pop()
+            code = pop_code()
+            if isinstance(fragment, BinNode):
+                push(fragment.right)
+                push_code(code + '1')
+                push(fragment.left)
+                push_code(code + '0')
+            elif isinstance(fragment, Node):
+                for i in range(list.__len__(fragment) - 1, -1, -1):
+                    push(fragment[i])
+                    push_code(f"{code}{i}")
+            else:
+                call(fragment.value, code)
+
+    def __depth__(self, offset: int) -> int:
+        for depth, _ in enumerate(__levels__(self), offset):
+            pass
+        return depth
+
+    def __layer__(self, layers: list[list], offset: int):
+        for depth, layer in enumerate(__levels__(self), offset):
+            if depth == len(layers):
+                layers.append([])
+            layers[depth].extend(layer)
+
+    def code(self, call: Callable) -> None:
+        """Get mapping code of the tree
+
+        Args:
+            call (Callable): Something to call when ending into leaf
+        """
+        self.__code__(call, '')
+
+    def codes(self) -> tuple[list, array | list, array]:
+        """Get the code of every leaf at once
+
+        Codes are integers built in a single walk without strings: each node appends
+        the index of the child on the bits its number of children needs (1 for a
+        binary node). Leafs are listed in the same order as code visits them.
+
+        Returns:
+            tuple[list, array | list, array]: Parallel arrays of the leaf values, their codes (a list of int beyond 64 bits) and their lengths in bits
+        """
+        values = []
+        codes = []
+        lengths = array('q')
+        stack = [(self, 0, 0)]
+        pop, push = stack.pop, stack.append
+        while stack:
+            fragment, code, length = pop()
+            if isinstance(fragment, BinNode):
+                code <<= 1
+                length += 1
+                push((fragment.right, code | 1, length))
+                push((fragment.left, code, length))
+            elif isinstance(fragment, Node):
+                width = (list.__len__(fragment) - 1).bit_length()
+                code <<= width
+                length += width
+                for i in range(list.__len__(fragment) - 1, -1, -1):
+                    push((fragment[i], code | i, length))
+            else:
+                values.append(fragment.value)
+                codes.append(code)
+                lengths.append(length)
+        if max(lengths, default=0) <= 64:
+            codes = array('Q', codes)
+        return values, codes, lengths
+
+    def index(self) -> TreeIndex:
+        """Get the lookup index of the tree
+
+        Built on first call then kept until <<, >> or | changes a Node of the tree.
+
+        Returns:
+            TreeIndex: The index
+        """
+        if self.lookup is None:
+            self.lookup = TreeIndex(self)
+        return self.lookup
+
+    def to_tuple(self) -> tuple[tuple | Any]:
+        """Turn itself into a tuple
+
+        Returns:
+            tuple[tuple | Any]: Self but converted
+        """
+        below = []  # Tuples of the deeper layer, in order
+        for layer in reversed(list(__levels__(self))):
+            children = iter(below)
+            take = children.__next__
+            below = []
+            push = below.append
+            for fragment in layer:
+                if isinstance(fragment, BinNode):
+                    push((take(), take()))
+                elif isinstance(fragment, Node):
+                    push(tuple(islice(children, list.__len__(fragment))))
+                else:
+                    push(fragment.value)
+        return below[0]
 
     def spread(self, calls: tuple[Callable, Callable], *args) -> Any:
         """Spread a call into a tree 
@@ -192,12 +436,185 @@ class __NodeFragment:
         """
         return calls[0](self, calls, *args)
 
+    def map_reduce(self, leaf_fn: Callable, combine_fn: Callable, executor: Executor | None = None, depth: int | None = None) -> Any:
+        """Reduce the tree bottom-up, subtrees in parallel
+
+        The tree is split at a depth: each subtree rooted there (and each leaf
+        above) is reduced as a task of the executor, then the nodes above are
+        combined here. With a ProcessPoolExecutor, subtrees and both callables
+        are pickled, so they must be defined at module level.
+
+        Args:
+            leaf_fn (Callable): Something called like leaf_fn(leaf) on each leaf
+            combine_fn (Callable): Something called like combine_fn(node, results) on each node, with the results of its children in order
+            executor (Executor | None, optional): A thread or process pool, None to reduce here. Defaults to None.
+            depth (int | None, optional): Depth of the split, None for the first layer with MAP_TASKS subtrees per cpu. Defaults to None.
+
+        Returns:
+            Any: Anything returned by combine_fn(self, results)
+        """
+        if executor is None:
+            return __fold__(self, leaf_fn, combine_fn)
+        if depth is None:
+            tasks = MAP_TASKS * (cpu_count() or 1)
+            for depth, layer in enumerate(__levels__(self)):
+                if len(layer) >= tasks:
+                    break
+        top = []  # Nodes above the split, layer by layer
+        results = {}  # Result (or future) of each fragment by id
+        layer = [self]
+        for level in range(depth + 1):
+            below = []
+            for fragment in layer:
+                children = fragment.__children__()
+                if level == depth or not children:
+                    results[id(fragment)] = executor.submit(__fold__, fragment, leaf_fn, combine_fn)
+                else:
+                    top.append(fragment)
+                    below += children
+            layer = below
+        for key, future in results.items():
+            results[key] = future.result()
+        for node in reversed(top):  # Children first
+            results[id(node)] = combine_fn(node, [results[id(child)] for child in node.__children__()])
+        return results[id(self)]
+
+
+# * Traversal
+
+
+def __levels__(root: Any) -> Iterator[list]:
+    """Walk a tree layer by layer
+
+    Args:
+        root (Any): Root of the tree
+
+    Returns:
+        Iterator[list]: The fragments of each layer by depth
+    """
+    layer = [root]
+    while layer:
+        yield layer
+        layer = [child for fragment in layer for child in fragment.__children__()]
+
+
+def preorder(root: Any) -> Iterator[tuple[Any, int]]:
+    """Walk a tree in pre-order (node then children)
+
+    Trees of any depth are supported, there is no recursion.
+
+    Args:
+        root (Any): Root of the tree
+
+    Returns:
+        Iterator[tuple[Any, int]]: Each fragment with its depth (0 for the root)
+    """
+    stack = [(root, 0)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        fragment, depth = pop()
+        yield fragment, depth
+        depth += 1
+        for child in reversed(fragment.__children__()):
+            push((child, depth))
+
+
+def inorder(root: Any) -> Iterator[tuple[Any, int]]:
+    """Walk a tree in in-order (first child, node then the other children)
+
+    Args:
+        root (Any): Root of the tree
+
+    Returns:
+        Iterator[tuple[Any, int]]: Each fragment with its depth (0 for the root)
+    """
+    stack = [(root, 0, False)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        fragment, depth, expanded = pop()
+        children = fragment.__children__()
+        if expanded or not children:
+            yield fragment, depth
+        else:
+            for child in reversed(children[1:]):
+                push((child, depth + 1, False))
+            push((fragment, depth, True))
+            push((children[0], depth + 1, False))
+
+
+def postorder(root: Any) -> Iterator[tuple[Any, int]]:
+    """Walk a tree in post-order (children then node)
+
+    Args:
+        root (Any): Root of the tree
+
+    Returns:
+        Iterator[tuple[Any, int]]: Each fragment with its depth (0 for the root)
+    """
+    stack = [(root, 0, False)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        fragment, depth, expanded = pop()
+        children = fragment.__children__()
+        if expanded or not children:
+            yield fragment, depth
+        else:
+            push((fragment, depth, True))
+            for child in reversed(children):
+                push((child, depth + 1, False))
+
+
+def breadth_first(root: Any) -> Iterator[tuple[Any, int]]:
+    """Walk a tree layer by layer, from left to right
+
+    Args:
+        root (Any): Root of the tree
+
+    Returns:
+        Iterator[tuple[Any, int]]: Each fragment with its depth (0 for the root)
+    """
+    for depth, layer in enumerate(__levels__(root)):
+        for fragment in layer:
+            yield fragment, depth
+
+
+def __fold__(root: Any, leaf_fn: Callable, combine_fn: Callable) -> Any:
+    """Reduce a tree in post-order
+
+    Args:
+        root (Any): Root of the tree
+        leaf_fn (Callable): Something called like leaf_fn(leaf)
+        combine_fn (Callable): Something called like combine_fn(node, results)
+
+    Returns:
+        Any: The result of the root
+    """
+    stack = [(root, None)]  # Fragments with the number of their children once expanded
+    results = []
+    pop, push = stack.pop, stack.append
+    while stack:
+        fragment, lenght = pop()
+        if lenght is not None:
+            start = len(results) - lenght
+            results[start:] = (combine_fn(fragment, results[start:]),)
+            continue
+        children = fragment.__children__()
+        if not children:
+            results.append(leaf_fn(fragment))
+        else:
+            push((fragment, len(children)))
+            for i in range(len(children) - 1, -1, -1):  # Reversed to pop the first child first
+                push((children[i], None))
+    return results[0]
+
 
 # * Binary tree
 
 
 class __BinFragment(__Fragment):
 
+    __slots__ = ()
+
     def __add__(self, fragment: __BinFragment) -> BinNode:
         """Sum 2 __BinFragment into a new parent Node
 
@@ -210,11 +627,12 @@ class __BinFragment(__Fragment):
         return BinNode(self.weight + fragment.weight, self, fragment)
 
 
+@dataclass(eq=False, repr=False, slots=True)
 class BinLeaf(__LeafFragment, __BinFragment):
     ...
 
 
-@dataclass(repr=False)
+@dataclass(repr=False, slots=True)
 class BinNode(__BinFragment, __NodeFragment):
 
     """A binary node of a tree
@@ -229,6 +647,7 @@ class BinNode(__BinFragment, __NodeFragment):
 
     left: __BinFragment
     right: __BinFragment
+    lookup: TreeIndex | None = field(default=None, init=False, repr=False, compare=False)  # TreeIndex built by index
 
     def __len__(self) -> int:
         """Get total number of BinNode and BinLeaf
@@ -236,34 +655,35 @@ class BinNode(__BinFragment, __NodeFragment):
         Returns:
             int: Total number of __BinFragment of the tree
         """
-        return len(self.left) + len(self.right) + 1
-
-    def __tree__(self, offset: str) -> str:
-        indent = offset + f"│\n{offset}" * Y_SPACE
-        return f"""┮ {self.weight}\n{indent}├{X_STROKE}{self.left.__tree__(f"{offset}│{X_INDENT}")}\n{indent}└{X_STROKE}{self.right.__tree__(f"{offset} {X_INDENT}")}"""
+        return sum(map(len, __levels__(self)))
 
-    def __code__(self, call: Callable, code: str) -> None:
-        self.left.__code__(call, f"{code}0")
-        self.right.__code__(call, f"{code}1")
+    def __children__(self) -> tuple[__BinFragment, __BinFragment]:
+        return self.left, self.right
 
-    def __depth__(self, offset: int) -> int:
-        offset += 1
-        return max(self.left.__depth__(offset), self.right.__depth__(offset))
-
-    def __layer__(self, layers: list[list], offset: int):
-        layers[offset].append(self)
-        offset += 1
-        if offset == len(layers):
-            layers.append([])
-        self.left.__layer__(layers, offset)
-        self.right.__layer__(layers, offset)
+    def __code__(self, call: Callable, code: str, depth: int = RECURSION_DEPTH) -> None:
+        # Recursion is the fastest walk, the explicit stack only takes over past depth layers
+        if not depth:
+            return self.__stack_code__(call, code)
+        depth -= 1
+        self.left.__code__(call, f"{code}0", depth)
+        self.right.__code__(call, f"{code}1", depth)
 
     @classmethod
     def __from_tuple__(cls, value: tuple | Any) -> __BinFragment:
-        if isinstance(value, tuple):
-            return cls.__from_tuple__(value[0]) + cls.__from_tuple__(value[1])
-        else:
-            return BinLeaf(1, value)
+        stack = [(value, False)]
+        built = []  # Fragments of the children not yet grouped
+        while stack:
+            value, expanded = stack.pop()
+            if not isinstance(value, tuple):
+                built.append(BinLeaf(1, value))
+            elif expanded:
+                right = built.pop()
+                built[-1] += right
+            else:
+                stack.append((value, True))
+                stack.append((value[1], False))
+                stack.append((value[0], False))
+        return built[0]
 
     @classmethod
     def from_tuple(cls, root: tuple) -> BinNode:
@@ -285,22 +705,23 @@ class BinNode(__BinFragment, __NodeFragment):
         right = cls.__from_tuple__(root[1])
         return cls(left.weight + right.weight, left, right)
 
-    def to_tuple(self) -> tuple[tuple | Any]:
-        """Turn itself into a tuple
+    @classmethod
+    def from_bytes(cls, stdin: bytes | memoryview | mmap) -> BinNode | BinLeaf:
+        """Build itself from a serialized tree
 
-        Returns:
-            tuple[tuple | Any]: Self but converted
-        """
-        return (self.left.to_tuple(), self.right.to_tuple())
+        Args:
+            stdin (bytes | memoryview | mmap): A tree serialized by to_bytes
 
-    def code(self, call: Callable) -> None:
-        """Get mapping code of binary tree
+        Raises:
+            ValueError: If it isn't a serialized binary tree
 
-        Args:
-            call (Callable): Something to call when ending into leaf
+        Returns:
+            BinNode | BinLeaf: Root of the tree
         """
-        self.left.__code__(call, '0')
-        self.right.__code__(call, '1')
+        with TreeView(stdin) as view:
+            if not view.binary:
+                raise ValueError("not a binary tree")
+            return view.__build__(cls, BinLeaf)
 
 
 # * Multi child tree
@@ -308,6 +729,17 @@ class BinNode(__BinFragment, __NodeFragment):
 
 class __MulFragment(__Fragment):
 
+    __slots__ = ()
+
+    def __getstate__(self) -> dict:
+        # A pickled subtree is detached, rather than dragging the whole tree through its parent
+        return {name: getattr(self, name) for name in self.__slots__ if name not in ("parent", "lookup")}
+
+    def __setstate__(self, state: dict) -> None:
+        self.parent = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __add__(self, fragment: __MulFragment) -> Node:
         """Sum 2 __MulFragment into a new parent Node
 
@@ -320,8 +752,12 @@ class __MulFragment(__Fragment):
         return Node(self.weight + fragment.weight, [self, fragment])
 
 
+@dataclass(eq=False, repr=False, slots=True)
 class Leaf(__LeafFragment, __MulFragment):
-    ...
+
+    parent: Node | None = field(default=None, init=False, repr=False, compare=False)  # Node it was last attached to
+    size = 1  # Fragments of the subtree
+    height = 1  # Layers of the subtree
 
 
 class Node(__MulFragment, __NodeFragment, list):
@@ -330,22 +766,54 @@ class Node(__MulFragment, __NodeFragment, list):
 
     It can contain an open mount of child (from 1 to infinit)
 
+    Each node knows its parent and caches the size, the number of layers and the
+    weight of its subtree. Inserting or merging with <<, >> and | only updates
+    the path to the root, so len(), depth and weight are O(1), and drops the
+    lookup indexes on this path. Children added by list methods or weights
+    changed by hand aren't tracked.
+
     Args:
         weight (int): Weight of node
         childs (Iterable): Children of node
     """
 
+    __slots__ = ("weight", "size", "height", "parent", "lookup")  # parent: Node it was last attached to, lookup: TreeIndex built by index
+
     def __init__(self, weight: int, childs: Iterable):
         self.weight = weight
-        self.extend(childs)
+        self.size = 1
+        self.height = 1
+        self.parent = None
+        self.lookup = None
+        list.extend(self, childs)
+        for child in list.__iter__(self):
+            child.parent = self
+            self.size += child.size
+            if child.height >= self.height:
+                self.height = child.height + 1
 
     def __len__(self) -> int:
         """Get total number of Node and Leaf
 
         Returns:
-            int: Total number of __MulFragment of the tree
+            int: Total number of __MulFragment of the tree (cached)
         """
-        return sum(len(child) for child in self) + list.__len__(self)
+        return self.size
+
+    def __depth__(self, offset: int) -> int:
+        return offset + self.height - 1
+
+    def __grow__(self, weight: int, size: int, height: int) -> None:
+        # Update the cached aggregates from here to the root (height is the one of the added subtree)
+        node = self
+        while node is not None:
+            node.lookup = None
+            node.weight += weight
+            node.size += size
+            if height >= node.height:
+                node.height = height + 1
+            height = node.height
+            node = node.parent
 
     def __lshift__(self, child: __MulFragment) -> Node:
         """Insert a child from right
@@ -357,7 +825,8 @@ class Node(__MulFragment, __NodeFragment, list):
             Node: Self
         """
         self.append(child)
-        self.weight += child.weight
+        child.parent = self
+        self.__grow__(child.weight, child.size, child.height)
         return self
 
     def __rshift__(self, child: __MulFragment) -> Node:
@@ -370,54 +839,62 @@ class Node(__MulFragment, __NodeFragment, list):
             Node: Self
         """
         self.insert(0, child)
-        self.weight += child.weight
+        child.parent = self
+        self.__grow__(child.weight, child.size, child.height)
         return self
 
     def __or__(self, node: Node) -> Node:
         """Merge a node in self
 
+        Its children are shared, their parent becomes self.
+
         Args:
             node (Node): A tree Node
 
         Returns:
             Node: Self
         """
-        self.extend(node)
-        self.weight += node.weight
+        children = node[:]
+        list.extend(self, children)
+        for child in children:
+            child.parent = self
+        self.__grow__(node.weight, node.size - 1, node.height - 1)
         return self
 
-    def __tree__(self, offset: str) -> str:
-        indent = offset + f"│\n{offset}" * Y_SPACE
-        repr_ = f"┮ {self.weight}\n"
-        for i in range(list.__len__(self) - 1):
-            repr_ += f"""{indent}├{X_STROKE}{self[i].__tree__(f"{offset}│{X_INDENT}")}\n"""
-        return repr_ + f"""{indent}└{X_STROKE}{self[-1].__tree__(f"{offset} {X_INDENT}")}"""
-
-    def __code__(self, call: Callable, code: str) -> None:
-        for i, child in enumerate(self):
-            child.__code__(call, f"{code}{i}")
+    def __setstate__(self, state: dict) -> None:
+        super().__setstate__(state)
+        self.lookup = None
+        for child in list.__iter__(self):  # Children are unpickled first
+            child.parent = self
 
-    def __depth__(self, offset: int) -> int:
-        offset += 1
-        return max(child.__depth__(offset) for child in self)
+    def __children__(self) -> list[__MulFragment]:
+        return self[:]  # A plain list, its len() doesn't walk the subtree
 
-    def __layer__(self, layers: list[list], offset: int):
-        layers[offset].append(self)
-        offset += 1
-        if offset == len(layers):
-            layers.append([])
-        for child in self:
-            child.__layer__(layers, offset)
+    def __code__(self, call: Callable, code: str, depth: int = RECURSION_DEPTH) -> None:
+        # Same as BinNode.__code__
+        if not depth:
+            return self.__stack_code__(call, code)
+        depth -= 1
+        for i, child in enumerate(list.__iter__(self)):
+            child.__code__(call, f"{code}{i}", depth)
 
     @classmethod
     def __from_tuple__(cls, value: tuple | Any) -> Node | Leaf:
-        if isinstance(value, tuple):
-            node = cls(0, ())
-            for child in value:
-                node << cls.__from_tuple__(child)
-            return node
-        else:
-            return Leaf(1, value)
+        stack = [(value, False)]
+        built = []  # Fragments of the children not yet grouped
+        while stack:
+            value, expanded = stack.pop()
+            if not isinstance(value, tuple):
+                built.append(Leaf(1, value))
+            elif expanded:
+                node = cls(0, ())
+                for child in built[len(built) - len(value):]:
+                    node << child
+                built[len(built) - len(value):] = (node,)
+            else:
+                stack.append((value, True))
+                stack.extend((child, False) for child in reversed(value))
+        return built[0]
 
     @classmethod
     def from_tuple(cls, root: tuple) -> Node:
@@ -435,27 +912,746 @@ class Node(__MulFragment, __NodeFragment, list):
         lenght = len(root)
         if lenght < 2:
             raise ChildError(f"require at least 2 children ({lenght} given)")
-        node = cls(0, ())
-        for child in root:
-            node << cls.__from_tuple__(child)
-        return node
+        return cls.__from_tuple__(tuple(root))
 
-    def to_tuple(self) -> tuple[tuple | Any]:
+    @classmethod
+    def from_bytes(cls, stdin: bytes | memoryview | mmap) -> Node | Leaf:
+        """Build itself from a serialized tree
+
+        A serialized binary tree is loaded as Node and Leaf too.
+
+        Args:
+            stdin (bytes | memoryview | mmap): A tree serialized by to_bytes
+
+        Raises:
+            ValueError: If it isn't a serialized tree
+
+        Returns:
+            Node | Leaf: Root of the tree
+        """
+        with TreeView(stdin) as view:
+            return view.__build__(cls, Leaf)
+
+
+# * Lookup index
+
+
+class TreeIndex:
+
+    """Lookup tables of a tree
+
+    Codes are tuples of child indexes from the root, like (0, 1, 1) for the code
+    '011' of a binary tree. If some leafs share a value, the first one in
+    pre-order is kept. Each fragment only stores its parent and its index in it,
+    so the index takes O(n) memory whatever the depth and codes are rebuilt in
+    O(depth).
+
+    Args:
+        root (BinNode | Node): Root of the tree
+
+    Raises:
+        TypeError: If a value isn't hashable
+    """
+
+    __slots__ = ("root", "leafs", "parents")
+
+    def __init__(self, root: BinNode | Node):
+        self.root = root
+        self.leafs = {}
+        self.parents = {}  # id of each fragment below the root: (parent, index in parent)
+        stack = [root]
+        pop, push = stack.pop, stack.append
+        parents = self.parents
+        while stack:
+            fragment = pop()
+            if isinstance(fragment, BinNode):
+                parents[id(fragment.right)] = (fragment, 1)
+                parents[id(fragment.left)] = (fragment, 0)
+                push(fragment.right)
+                push(fragment.left)
+            elif isinstance(fragment, Node):
+                for i in range(list.__len__(fragment) - 1, -1, -1):
+                    child = fragment[i]
+                    parents[id(child)] = (fragment, i)
+                    push(child)
+            elif fragment.value not in self.leafs:
+                self.leafs[fragment.value] = fragment
+
+    def __len__(self) -> int:
+        return len(self.leafs)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self.leafs
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(values={len(self)})"
+
+    def leaf(self, value: Any) -> BinLeaf | Leaf:
+        """Find a leaf, in O(1)
+
+        Args:
+            value (Any): Its value
+
+        Raises:
+            KeyError: If no leaf has this value
+
+        Returns:
+            BinLeaf | Leaf: The leaf
+        """
+        return self.leafs[value]
+
+    def code(self, value: Any) -> tuple[int, ...]:
+        """Get the code of a leaf, in O(depth)
+
+        Args:
+            value (Any): Its value
+
+        Raises:
+            KeyError: If no leaf has this value
+
+        Returns:
+            tuple[int, ...]: Its code
+        """
+        fragment = self.leafs[value]
+        parents = self.parents
+        code = []
+        while fragment is not self.root:
+            fragment, i = parents[id(fragment)]
+            code.append(i)
+        code.reverse()
+        return tuple(code)
+
+    def node(self, code: str | Iterable[int]) -> Any:
+        """Reach a node or a leaf by its code, in O(depth)
+
+        Args:
+            code (str | Iterable[int]): A code from the root, a prefix of leaf codes gives a node
+
+        Raises:
+            KeyError: If nothing is at this code
+
+        Returns:
+            Any: The fragment
+        """
+        return self.path(code)[-1]
+
+    def path(self, code: str | Iterable[int]) -> list:
+        """Get the fragments from the root to a code, in O(depth)
+
+        Args:
+            code (str | Iterable[int]): A code from the root, see code to get the one of a value
+
+        Raises:
+            KeyError: If nothing is at this code
+
+        Returns:
+            list: The fragments, from the root
+        """
+        fragment = self.root
+        path = [fragment]
+        for i in code:
+            i = int(i)
+            if isinstance(fragment, BinNode) and 0 <= i < 2:
+                fragment = fragment.right if i else fragment.left
+            elif isinstance(fragment, Node) and 0 <= i < list.__len__(fragment):
+                fragment = list.__getitem__(fragment, i)
+            else:
+                raise KeyError(code)
+            path.append(fragment)
+        return path
+
+
+# * Array tree
+
+
+class ArrayTree:
+
+    """A tree stored as parallel arrays
+
+    Nodes are numbered in breadth-first order (the root is 0), so the children
+    of a node and each layer are contiguous: children of node i are the nodes
+    offsets[i] to offsets[i + 1] (none for a leaf) and layer d is the nodes
+    levels[d] to levels[d + 1]. A node costs about 3 machine words.
+
+    Args:
+        weights (array | list): Weight of each node (an array of int64 when possible)
+        values (list): Value of each leaf, None for nodes
+        offsets (array): First child of each node, followed by the number of nodes
+        levels (array): First node of each layer, followed by the number of nodes
+        binary (bool): If it converts to BinNode / BinLeaf rather than Node / Leaf
+    """
+
+    __slots__ = ("weights", "values", "offsets", "levels", "binary")
+
+    def __init__(self, weights: array | list, values: list, offsets: array, levels: array, binary: bool):
+        self.weights = weights
+        self.values = values
+        self.offsets = offsets
+        self.levels = levels
+        self.binary = binary
+
+    def __len__(self) -> int:
+        """Get total number of nodes and leafs
+
+        Returns:
+            int: Size of the tree
+        """
+        return len(self.values)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={len(self)}, depth={self.depth}, w={self.weight})"
+
+    @staticmethod
+    def __weights__(weights: list) -> array | list:
+        try:
+            return array('q', weights)
+        except (TypeError, OverflowError):
+            return weights  # Kept as they are to stay lossless
+
+    @classmethod
+    def from_tree(cls, root: BinNode | BinLeaf | Node | Leaf) -> ArrayTree:
+        """Build itself from a tree of objects
+
+        Args:
+            root (BinNode | BinLeaf | Node | Leaf): Root of the tree
+
+        Raises:
+            ChildError: If a Node has no children
+
+        Returns:
+            ArrayTree: The same tree
+        """
+        queue = [root]
+        weights = []
+        values = []
+        offsets = array('q')
+        levels = array('q', [0])
+        end = 1  # End of the current layer
+        for i, fragment in enumerate(queue):  # The queue grows while iterating
+            if i == end:
+                levels.append(i)
+                end = len(queue)
+            offsets.append(len(queue))
+            weights.append(fragment.weight)
+            if isinstance(fragment, BinNode):
+                queue.append(fragment.left)
+                queue.append(fragment.right)
+                values.append(None)
+            elif isinstance(fragment, Node):
+                if not list.__len__(fragment):
+                    raise ChildError("require at least 1 child (0 given)")
+                queue.extend(fragment)
+                values.append(None)
+            else:
+                values.append(fragment.value)
+        offsets.append(len(queue))
+        levels.append(len(queue))
+        return cls(cls.__weights__(weights), values, offsets, levels, isinstance(root, (BinNode, BinLeaf)))
+
+    @classmethod
+    def from_tuple(cls, root: tuple, binary: bool = True) -> ArrayTree:
+        """Build itself from a tuple
+
+        Like BinNode.from_tuple or Node.from_tuple, leafs weigh 1.
+
+        Args:
+            root (tuple): A tuple version of a tree
+            binary (bool, optional): If the tree is binary. Defaults to True.
+
+        Raises:
+            ChildError: If the tuple have less than 2 children
+
+        Returns:
+            ArrayTree: A tree corresponding to the tuple
+        """
+        lenght = len(root)
+        if lenght < 2:
+            raise ChildError(f"require at least 2 children ({lenght} given)")
+        queue = [root]
+        values = []
+        offsets = array('q')
+        levels = array('q', [0])
+        end = 1
+        for i, value in enumerate(queue):
+            if i == end:
+                levels.append(i)
+                end = len(queue)
+            offsets.append(len(queue))
+            if isinstance(value, tuple):
+                queue.extend(value[:2] if binary else value)
+                values.append(None)
+            else:
+                values.append(value)
+        offsets.append(len(queue))
+        levels.append(len(queue))
+        weights = array('q', bytes(8 * len(values)))
+        for i in range(len(values) - 1, -1, -1):  # Children first
+            start, stop = offsets[i], offsets[i + 1]
+            weights[i] = sum(weights[start:stop]) if start < stop else 1
+        return cls(weights, values, offsets, levels, binary)
+
+    def to_tree(self) -> BinNode | BinLeaf | Node | Leaf:
+        """Turn itself into a tree of objects
+
+        Returns:
+            BinNode | BinLeaf | Node | Leaf: Root of the same tree
+        """
+        weights, values, offsets = self.weights, self.values, self.offsets
+        fragments = [None] * len(values)
+        for i in range(len(values) - 1, -1, -1):  # Children first
+            start, stop = offsets[i], offsets[i + 1]
+            if start == stop:
+                fragments[i] = (BinLeaf if self.binary else Leaf)(weights[i], values[i])
+            elif self.binary:
+                fragments[i] = BinNode(weights[i], fragments[start], fragments[start + 1])
+            else:
+                fragments[i] = Node(weights[i], fragments[start:stop])
+        return fragments[0]
+
+    def to_tuple(self) -> tuple[tuple | Any] | Any:
         """Turn itself into a tuple
 
         Returns:
-            tuple[tuple | Any]: Self but converted
+            tuple[tuple | Any] | Any: Self but converted
+        """
+        values, offsets = self.values, self.offsets
+        tuples = [None] * len(values)
+        for i in range(len(values) - 1, -1, -1):
+            start, stop = offsets[i], offsets[i + 1]
+            tuples[i] = tuple(tuples[start:stop]) if start < stop else values[i]
+        return tuples[0]
+
+    @property
+    def weight(self) -> int:
+        """Weight of the root
+
+        Returns:
+            int: The weight
+        """
+        return self.weights[0]
+
+    @property
+    def depth(self) -> int:
+        """Depth of the tree, in O(1)
+
+        Returns:
+            int: His maximal depth (the number of layers)
+        """
+        return len(self.levels) - 1
+
+    @property
+    def layers(self) -> list[range]:
+        """Get each layers of the tree
+
+        Returns:
+            list[range]: Nodes of each layer by depth
+        """
+        return [range(self.levels[d], self.levels[d + 1]) for d in range(self.depth)]
+
+    def layer_stats(self, max_depth: int | None = None) -> tuple[array, array | list]:
+        """Count the nodes and sum their weights layer by layer
+
+        Args:
+            max_depth (int | None, optional): Number of layers to look at, None for all. Defaults to None.
+
+        Returns:
+            tuple[array, array | list]: The number of nodes and the weight of each layer
+        """
+        levels = self.levels[:len(self.levels) if max_depth is None else max_depth + 1]
+        counts = array('q', (levels[d + 1] - levels[d] for d in range(len(levels) - 1)))
+        weights = [sum(self.weights[levels[d]:levels[d + 1]]) for d in range(len(levels) - 1)]
+        return counts, self.__weights__(weights)
+
+    def children(self, i: int) -> range:
+        """Get the children of a node
+
+        Args:
+            i (int): A node
+
+        Returns:
+            range: His children, empty for a leaf
         """
-        return *(child.to_tuple() for child in self),
+        return range(self.offsets[i], self.offsets[i + 1])
+
+    def is_leaf(self, i: int) -> bool:
+        return self.offsets[i] == self.offsets[i + 1]
 
     def code(self, call: Callable) -> None:
-        """Get mapping code of binary tree
+        """Get mapping code of the tree
+
+        Leafs are visited in the same order as BinNode.code and Node.code.
 
         Args:
             call (Callable): Something to call when ending into leaf
         """
-        for i, child in enumerate(self):
-            child.__code__(call, str(i))
+        values, offsets = self.values, self.offsets
+        stack = [0]
+        codes = ['']
+        pop, push, push_code = stack.pop, stack.append, codes.append
+        while stack:
+            i = pop()
+            code = codes.pop()
+            start = offsets[i]
+            stop = offsets[i + 1]
+            if start == stop:
+                call(values[i], code)
+            else:
+                for k in range(stop - start - 1, -1, -1):  # Reversed to pop the first child first
+                    push(start + k)
+                    push_code(code + str(k))
+
+
+# * Serialization
+
+
+def __pack_value__(value: Any) -> bytes:
+    """Serialize a leaf value behind its type tag
+
+    Args:
+        value (Any): None, bool, int, float, str or bytes
+
+    Raises:
+        TypeError: If the value has an other type
+
+    Returns:
+        bytes: The tag followed by the value
+    """
+    try:
+        tag = VALUE_TYPES.index(type(value))
+    except ValueError:
+        raise TypeError(f"can't serialize a {type(value).__name__} value") from None
+    if value is None:
+        return bytes((tag,))
+    if isinstance(value, int):  # A bool too
+        return bytes((tag,)) + value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+    if isinstance(value, float):
+        return bytes((tag,)) + FLOAT.pack(value)
+    if isinstance(value, str):
+        return bytes((tag,)) + value.encode()
+    return bytes((tag,)) + value
+
+
+def __unpack_value__(tag: int, payload: bytes | memoryview) -> Any:
+    """Deserialize a leaf value
+
+    Args:
+        tag (int): Index of its type in VALUE_TYPES
+        payload (bytes | memoryview): The bytes following the tag
+
+    Returns:
+        Any: The value
+    """
+    kind = VALUE_TYPES[tag]
+    if kind is int:
+        return int.from_bytes(payload, "little", signed=True)
+    if kind is str:
+        return str(payload, "utf-8")
+    if kind is bytes:
+        return bytes(payload)
+    if kind is float:
+        return FLOAT.unpack(payload)[0]
+    if kind is bool:
+        return bool(payload[0])
+    return None
+
+
+def __padding__(size: int) -> bytes:
+    return bytes(-size % TREE_ALIGN)
+
+
+def __dump__(root: Any) -> bytes:
+    """Serialize a tree in pre-order, see TreeView for the format
+
+    Args:
+        root (Any): Root of a tree
+
+    Raises:
+        ChildError: If a Node has no children
+        TypeError: If a value can't be serialized
+
+    Returns:
+        bytes: The tree in binary
+    """
+    binary = isinstance(root, (BinNode, BinLeaf))
+    bits = []
+    weights = array('q')
+    offsets = array('Q', [0])
+    values = []
+    size = 0
+    for fragment, _ in preorder(root):
+        weights.append(fragment.weight)
+        if isinstance(fragment, BinNode):
+            bits.append('1')
+        elif isinstance(fragment, Node):
+            lenght = list.__len__(fragment)
+            if not lenght:
+                raise ChildError("require at least 1 child (0 given)")
+            bits.append('1' * lenght + '0')
+        else:
+            bits.append('0')
+            value = __pack_value__(fragment.value)
+            values.append(value)
+            size += len(value)
+            offsets.append(size)
+    bits = ''.join(bits)
+    bits += '0' * (-len(bits) % 8)  # Most significant bit first, padded at the end
+    structure = int(bits, 2).to_bytes(len(bits) // 8, "big")
+    if byteorder == "big":
+        weights.byteswap()
+        offsets.byteswap()
+    return b''.join((
+        TREE_HEADER.pack(TREE_MAGIC, TREE_VERSION, TREE_BINARY if binary else 0, len(weights), len(values)),
+        structure, __padding__(len(structure)),
+        weights.tobytes(),
+        offsets.tobytes(),
+        *values,
+    ))
+
+
+class TreeView:
+
+    """A serialized tree queried in place
+
+    The format is a header then 4 sections in pre-order, nodes are numbered in
+    this order (the root is 0):
+        - the structure bits, most significant first: 1 for a BinNode and 0 for
+          a BinLeaf, or for a Node as many 1 as children then a 0 and 0 for a Leaf
+        - the weight of each node as int64
+        - the offset of each leaf value, followed by the size of the values
+        - the values, each one is a type tag then its bytes
+    Numbers are little endian and sections are aligned, so the arrays are cast
+    from the buffer without copy. Only an index of 8 bytes per node is built, on
+    the first structural query.
+
+    Args:
+        stdin (bytes | memoryview | mmap): A tree serialized by to_bytes
+
+    Raises:
+        ValueError: If it isn't a serialized tree
+    """
+
+    __slots__ = ("buffer", "binary", "structure", "weights", "offsets", "values", "__ends", "__leafs", "__file")
+
+    def __init__(self, stdin: bytes | memoryview | mmap):
+        self.__file = None
+        self.buffer = memoryview(stdin).cast('B')
+        try:
+            self.__parse__()
+        except Exception:
+            self.close()  # A mmap can't be closed while a view of it is alive
+            raise
+        self.__ends = None
+        self.__leafs = None
+
+    def __parse__(self) -> None:
+        # Views of the sections, the header checked
+        buffer = self.buffer
+        if len(buffer) < TREE_HEADER.size:
+            raise ValueError("not a serialized tree")
+        magic, version, flags, nodes, leafs = TREE_HEADER.unpack_from(buffer)
+        if magic != TREE_MAGIC or version != TREE_VERSION:
+            raise ValueError("not a serialized tree")
+        self.binary = bool(flags & TREE_BINARY)
+        bits = nodes if self.binary else 2 * nodes - 1
+        start = TREE_HEADER.size
+        stop = start + (bits + 7) // 8
+        self.structure = buffer[start:stop]
+        start = stop + -stop % TREE_ALIGN
+        self.weights = self.__cast__(start, nodes, 'q')
+        self.offsets = self.__cast__(start + 8 * nodes, leafs + 1, 'Q')
+        start += 8 * (nodes + leafs + 1)
+        if len(buffer) < start + self.offsets[-1]:
+            raise ValueError("truncated tree")
+        self.values = buffer[start:start + self.offsets[-1]]
+
+    def __cast__(self, start: int, count: int, format: str) -> memoryview | array:
+        chunk = self.buffer[start:start + 8 * count]
+        if len(chunk) < 8 * count:
+            chunk.release()
+            raise ValueError("truncated tree")
+        if byteorder == "little":
+            return chunk.cast(format)
+        copy = array(format, chunk)  # Not zero-copy on big endian machines
+        copy.byteswap()
+        return copy
+
+    @classmethod
+    def from_file(cls, src: str) -> TreeView:
+        """Map a file saved with to_bytes
+
+        Args:
+            src (str): Path of the file
+
+        Raises:
+            ValueError: If it isn't a serialized tree
+
+        Returns:
+            TreeView: The tree, to close when done
+        """
+        with open(src, "rb") as file:
+            stdin = mmap(file.fileno(), 0, access=ACCESS_READ)
+        try:
+            view = cls(stdin)
+        except Exception:
+            stdin.close()
+            raise
+        view.__file = stdin
+        return view
+
+    def close(self) -> None:
+        """Release the buffer, and the file mapped by from_file"""
+        for name in ("weights", "offsets", "values", "structure", "buffer"):
+            view = getattr(self, name, None)  # Unset if the parsing failed
+            if isinstance(view, memoryview):
+                view.release()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self) -> TreeView:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """Get total number of nodes and leafs
+
+        Returns:
+            int: Size of the tree
+        """
+        return len(self.weights)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={len(self)}, leafs={len(self.offsets) - 1}, w={self.weight})"
+
+    def __arities__(self) -> list[int]:
+        # Number of children of each node in pre-order, from the structure bits
+        bits = format(int.from_bytes(self.structure, "big"), f"0{len(self.structure) * 8}b")
+        if self.binary:
+            return [2 if bit == '1' else 0 for bit in bits[:len(self)]]
+        return list(map(len, bits[:2 * len(self) - 1].split('0')[:len(self)]))
+
+    def __subtree_ends__(self) -> tuple[array, array]:
+        # End of the subtree of each node and the leafs in pre-order, both built once
+        if self.__ends is None:
+            arities = self.__arities__()
+            ends = array('q', bytes(8 * len(arities)))
+            leafs = array('q')
+            stack = []  # Ends of the subtrees after i, the first one on top
+            for i in range(len(arities) - 1, -1, -1):
+                arity = arities[i]
+                if arity:
+                    ends[i] = stack[-arity]
+                    del stack[len(stack) - arity:]
+                else:
+                    ends[i] = i + 1
+                    leafs.append(i)
+                stack.append(ends[i])
+            leafs.reverse()
+            self.__ends = ends
+            self.__leafs = leafs
+        return self.__ends, self.__leafs
+
+    def __build__(self, node: type, leaf: type) -> Any:
+        # Children first, in reverse pre-order the children of a node are on top of the stack
+        binary = issubclass(node, BinNode)
+        weights = self.weights
+        values = self.__values__()
+        stack = []
+        arities = self.__arities__()
+        for i in range(len(arities) - 1, -1, -1):
+            arity = arities[i]
+            if not arity:
+                stack.append(leaf(weights[i], values.pop()))
+            elif binary:
+                left = stack.pop()
+                stack[-1] = node(weights[i], left, stack[-1])
+            else:
+                children = stack[len(stack) - arity:]
+                children.reverse()
+                stack[len(stack) - arity:] = (node(weights[i], children),)
+        return stack[0]
+
+    def __value__(self, rank: int) -> Any:
+        start = self.offsets[rank]
+        return __unpack_value__(self.values[start], self.values[start + 1:self.offsets[rank + 1]])
+
+    def __values__(self) -> list:
+        # Every value at once, sliced from a single copy
+        values = bytes(self.values)
+        offsets = self.offsets
+        return [__unpack_value__(values[offsets[rank]], values[offsets[rank] + 1:offsets[rank + 1]]) for rank in range(len(offsets) - 1)]
+
+    def to_tree(self) -> BinNode | BinLeaf | Node | Leaf:
+        """Turn itself into a tree of objects
+
+        Returns:
+            BinNode | BinLeaf | Node | Leaf: Root of the same tree
+        """
+        if self.binary:
+            return self.__build__(BinNode, BinLeaf)
+        return self.__build__(Node, Leaf)
+
+    @property
+    def weight(self) -> int:
+        """Weight of the root
+
+        Returns:
+            int: The weight
+        """
+        return self.weights[0]
+
+    def children(self, i: int) -> list[int]:
+        """Get the children of a node
+
+        Args:
+            i (int): A node
+
+        Returns:
+            list[int]: His children, empty for a leaf
+        """
+        ends = self.__subtree_ends__()[0]
+        children = []
+        child = i + 1
+        while child < ends[i]:
+            children.append(child)
+            child = ends[child]
+        return children
+
+    def is_leaf(self, i: int) -> bool:
+        return self.__subtree_ends__()[0][i] == i + 1
+
+    def value(self, i: int) -> Any:
+        """Get the value of a leaf, in O(log n)
+
+        Args:
+            i (int): A node
+
+        Raises:
+            IndexError: If it isn't a leaf
+
+        Returns:
+            Any: The value
+        """
+        leafs = self.__subtree_ends__()[1]
+        rank = bisect_left(leafs, i)
+        if rank == len(leafs) or leafs[rank] != i:
+            raise IndexError(f"node {i} isn't a leaf")
+        return self.__value__(rank)
+
+    def leafs(self) -> Iterator[tuple[int, Any]]:
+        """Iterate over the leafs without building the index
+
+        Yields:
+            Iterator[tuple[int, Any]]: The weight and the value of each leaf, in pre-order
+        """
+        weights = self.weights
+        rank = 0
+        for i, arity in enumerate(self.__arities__()):
+            if not arity:
+                yield weights[i], self.__value__(rank)
+                rank += 1
 
 
 # * Tree build functions
@@ -475,9 +1671,7 @@ def huff_tree(iterable: Iterable) -> BinNode:
     Returns:
         BinNode: The root of the tree
     """
-    entropy_map = defaultdict(int)
-    for k in iterable:
-        entropy_map[k] += 1
+    entropy_map = Counter(iterable)  # Counted in C
 
     lenght = len(entropy_map)
     if lenght < 2:
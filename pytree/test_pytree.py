@@ -0,0 +1,37 @@
+#!/usr/bin/env python3.10
+# coding: utf-8
+
+# Regression tests of pytree.py, run with: python -m unittest discover -s pytree
+
+
+from os import path
+from tempfile import TemporaryDirectory
+import unittest
+
+from pytree import BinNode, TreeView
+
+
+class TestTreeView(unittest.TestCase):
+
+    def test_from_file_malformed(self):
+        data = BinNode.from_tuple((1, (2, "x"))).to_bytes()
+        with TemporaryDirectory() as tmp:
+            for name, content in (("garbage", b"not a serialized tree" * 4), ("truncated", data[:len(data) // 2])):
+                src = path.join(tmp, name)
+                with open(src, "wb") as file:
+                    file.write(content)
+                with self.subTest(name), self.assertRaises(ValueError):
+                    TreeView.from_file(src)
+
+    def test_from_file(self):
+        tree = BinNode.from_tuple((1, (2, "x")))
+        with TemporaryDirectory() as tmp:
+            src = path.join(tmp, "tree")
+            with open(src, "wb") as file:
+                file.write(tree.to_bytes())
+            with TreeView.from_file(src) as view:
+                self.assertEqual(view.to_tree().to_tuple(), tree.to_tuple())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3.10
+# coding: utf-8
+
+from heapq import heapify, heappop, heappush, heapreplace
+from random import Random
+from time import perf_counter
+import tracemalloc
+
+from heap import HeapBin
+
+
+OPERATIONS = 10 ** 6  # Operations of each kind
+SEED = 2022
+
+
+def timed(call) -> float:
+    start = perf_counter()
+    call()
+    return perf_counter() - start
+
+
+def bench_heapq(weights: list[float]) -> dict[str, float]:
+    """Time heapq on plain numbers
+
+    Args:
+        weights (list[float]): The numbers
+
+    Returns:
+        dict[str, float]: Seconds of each operation kind
+    """
+    heap = list(weights)
+    times = {"heapify": timed(lambda: heapify(heap))}
+    heap = []
+    times["push"] = timed(lambda: [heappush(heap, weight) for weight in weights])
+    times["replace"] = timed(lambda: [heapreplace(heap, weight) for weight in weights])
+    times["pop"] = timed(lambda: [heappop(heap) for _ in weights])
+    return times
+
+
+def bench_heapq_key(weights: list[float]) -> dict[str, float]:
+    """Time heapq on (key, index, item) entries, the usual way to get a key
+
+    Args:
+        weights (list[float]): The numbers
+
+    Returns:
+        dict[str, float]: Seconds of each operation kind
+    """
+    items = [(weight, i, str(i)) for i, weight in enumerate(weights)]
+    heap = list(items)
+    times = {"heapify": timed(lambda: heapify(heap))}
+    heap = []
+    times["push"] = timed(lambda: [heappush(heap, item) for item in items])
+    times["replace"] = timed(lambda: [heapreplace(heap, item) for item in items])
+    times["pop"] = timed(lambda: [heappop(heap) for _ in items])
+    return times
+
+
+def bench_heap_bin(weights: list[float], typed: bool = False) -> dict[str, float]:
+    """Time HeapBin on plain numbers
+
+    Args:
+        weights (list[float]): The numbers
+        typed (bool, optional): If weights go in an array. Defaults to False.
+
+    Returns:
+        dict[str, float]: Seconds of each operation kind
+    """
+    times = {"heapify": timed(lambda: HeapBin(*weights, typed=typed))}
+    heap = HeapBin(typed=typed)
+    times["extend"] = timed(lambda: heap.extend(weights))
+    heap = HeapBin(typed=typed)
+    times["push"] = timed(lambda: [heap.push(weight) for weight in weights])
+    times["replace"] = timed(lambda: [heap.replace(weight) for weight in weights])
+    times["pop"] = timed(lambda: [heap.pop() for _ in weights])
+    return times
+
+
+def heap_size(weights: list[float], typed: bool = False) -> int:
+    """Measure the memory held by a HeapBin keyed by new numbers
+
+    Args:
+        weights (list[float]): The numbers
+        typed (bool, optional): If weights go in an array. Defaults to False.
+
+    Returns:
+        int: Bytes allocated by the heap, the items excluded
+    """
+    tracemalloc.start()
+    try:
+        heap = HeapBin(*weights, key=float.__neg__, typed=typed)  # A max-heap, each weight is a new float
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    random = Random(SEED).random
+    weights = [random() for _ in range(OPERATIONS)]
+    for name, bench in (
+        ("heapq", bench_heapq),
+        ("heapq (key, i, item)", bench_heapq_key),
+        ("HeapBin", bench_heap_bin),
+        ("HeapBin(typed=True)", lambda weights: bench_heap_bin(weights, True)),
+    ):
+        times = bench(weights)
+        print(f"{name}: " + ", ".join(f"{kind} {seconds:.3f} s" for kind, seconds in times.items()))
+    for typed in (True, False):
+        print(f"HeapBin(key=float.__neg__, typed={typed}): {heap_size(weights, typed) / OPERATIONS:.1f} B/item")